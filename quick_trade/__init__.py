@@ -1,3 +1,3 @@
 from .utils import TradeSide, strategy
-from .brokers import TradingClient
+from .brokers import TradingClient, AsyncTradingClient, CachedTradingClient, PricePoller
 from .trading_sys import Trader, ExampleStrategies
@@ -1,4 +1,4 @@
-from json import dump, load
+from json import dump, dumps, load, loads
 import os
 import re
 
@@ -53,6 +53,45 @@ class Buffer:
     def values(self):
         return list(self._buffer.values())
 
+class JSONLines(object):
+    """
+    Append-only journal: one JSON document per line.
+    """
+    path: str
+
+    def __init__(self, filepath: str):
+        self.path = filepath
+
+    def clear(self):
+        with open(self.path, 'w', encoding='utf-8'):
+            pass
+
+    def append(self, data):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(dumps(data, ensure_ascii=False) + '\n')
+
+    def read(self) -> list:
+        if not os.path.isfile(self.path):
+            return []
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.endswith('\n'):  # the last line could be unfinished (the process was killed)
+                    records.append(loads(line))
+        return records
+
+    def repair(self):
+        # drop the unfinished last line, so the next records are appended after the finished ones
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'rb+') as file:
+            content = file.read()
+            file.truncate(content.rfind(b'\n') + 1)
+
+    def remove(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
 def read_json(path: str):
     return JSON(filepath=path).read()
 
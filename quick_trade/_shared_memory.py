@@ -0,0 +1,69 @@
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+from pandas import DataFrame
+
+_ALIGNMENT: int = 64
+
+
+class SharedFrame(object):
+    """
+    Columns of a DataFrame in one shared memory block.
+
+    SharedFrame is pickled as the name of the block and the layout of the columns, so it is sent to other
+    processes without the data, SharedFrame.frame() is a zero-copy read-only DataFrame (with RangeIndex).
+    The process that created the block must unlink it.
+    """
+    name: str
+    length: int
+    layout: List[Tuple[Any, str, int]]
+
+    def __init__(self, frame: DataFrame):
+        arrays: List[np.ndarray] = [np.ascontiguousarray(frame[column].values) for column in frame.columns]
+        for column, values in zip(frame.columns, arrays):
+            assert values.dtype != object, f'column {column} must be numeric'
+        self.length = len(frame)
+        self.layout = []
+        offset: int = 0
+        for column, values in zip(frame.columns, arrays):
+            self.layout.append((column, values.dtype.str, offset))
+            offset += -(-values.nbytes // _ALIGNMENT) * _ALIGNMENT
+        self._shm: Union[SharedMemory, None] = SharedMemory(create=True, size=max(offset, 1))
+        self.name = self._shm.name
+        for (column, dtype, offset), values in zip(self.layout, arrays):
+            np.ndarray(values.shape, dtype=dtype, buffer=self._shm.buf, offset=offset)[:] = values
+        self._frame: Union[DataFrame, None] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {'name': self.name, 'length': self.length, 'layout': self.layout}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self._shm = None
+        self._frame = None
+
+    def frame(self) -> DataFrame:
+        if self._frame is None:
+            if self._shm is None:
+                self._shm = SharedMemory(name=self.name)
+            columns: Dict[Any, np.ndarray] = {}
+            for column, dtype, offset in self.layout:
+                values = np.ndarray((self.length,), dtype=dtype, buffer=self._shm.buf, offset=offset)
+                values.flags.writeable = False
+                columns[column] = values
+            self._frame = DataFrame(columns, copy=False)
+        return self._frame
+
+    def close(self):
+        self._frame = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self):
+        if self._shm is None:
+            self._shm = SharedMemory(name=self.name)
+        shm = self._shm
+        self.close()
+        shm.unlink()
@@ -1,8 +1,126 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Condition, Event, Lock, Thread
+from time import sleep, time
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+from typing import Union
+from warnings import warn
+
+import numpy as np
 from ccxt import Exchange, binance
+from ccxt.async_support import Exchange as AsyncExchange
+from ccxt.async_support import binance as async_binance
 from pandas import DataFrame
 
 from . import utils
 
+# weights of the requests for the rate limiters (a request takes -weight tokens) if the exchange has no
+# REQUEST_ENDPOINTS, in simple requests like fetch_ticker (proportions of binance weights)
+REQUEST_WEIGHTS: Dict[str, float] = {
+    'fetch_ohlcv': 5.0,  # a page of 1000 candles
+    'fetch_ticker': 1.0,
+    'fetch_tickers': 40.0,  # all symbols
+    'fetch_balance': 10.0,
+    'create_order': 1.0,
+}
+# (api, method, path, cost key) of the requests in ccxt Exchange.api, the costs of the endpoints are in the same
+# units as Exchange.rateLimit, so they are used instead of REQUEST_WEIGHTS
+REQUEST_ENDPOINTS: Dict[str, Dict[str, Tuple[str, str, str, str]]] = {
+    'binance': {
+        'fetch_ohlcv': ('public', 'get', 'klines', 'cost'),
+        'fetch_ticker': ('public', 'get', 'ticker/24hr', 'cost'),
+        'fetch_tickers': ('public', 'get', 'ticker/24hr', 'noSymbol'),
+        'fetch_balance': ('private', 'get', 'account', 'cost'),
+        'create_order': ('private', 'post', 'order', 'cost'),
+    },
+}
+RATE_LIMIT_BURST: float = 10.0  # tokens of a bucket (requests that can be sent without waiting)
+
+
+class RateLimiter(object):
+    """
+    Token bucket: -rate tokens per second, at most -capacity tokens.
+    A request takes its weight of tokens, waiting if there are not enough (the debt is queued).
+    """
+    def __init__(self, rate: float, capacity: float = RATE_LIMIT_BURST):
+        assert rate > 0, 'rate must be greater than 0'
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time()
+        self._lock = Lock()
+
+    def reserve(self, weight: float = 1.0) -> float:
+        """
+        :return: seconds to wait before the request.
+        """
+        with self._lock:
+            now = time()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= weight
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self, weight: float = 1.0):
+        wait = self.reserve(weight)
+        if wait:
+            sleep(wait)
+
+    async def acquire_async(self, weight: float = 1.0):
+        wait = self.reserve(weight)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class _NoRateLimit(object):
+    def acquire(self, weight: float = 1.0):
+        pass
+
+    async def acquire_async(self, weight: float = 1.0):
+        pass
+
+
+def request_weight(client: Union[Exchange, AsyncExchange], request: str) -> float:
+    """
+    Tokens of the request: the cost of its endpoint in the ccxt api of the exchange (REQUEST_ENDPOINTS)
+    or REQUEST_WEIGHTS[request] if the cost is unknown.
+    """
+    endpoint = REQUEST_ENDPOINTS.get(getattr(client, 'id', None), {}).get(request)
+    if endpoint is not None:
+        api, method, path, key = endpoint
+        config = getattr(client, 'api', None)
+        for name in (api, method, path):
+            config = config.get(name) if isinstance(config, dict) else None
+        if isinstance(config, dict):
+            cost = config.get(key, config.get('cost'))
+            if isinstance(cost, (int, float)):
+                return float(cost)
+    return REQUEST_WEIGHTS.get(request, 1.0)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = Lock()
+
+
+def rate_limiter(client: Union[Exchange, AsyncExchange]) -> Union[RateLimiter, _NoRateLimit]:
+    """
+    Rate limiter of the exchange (shared by all clients of the process, including copies).
+    The rate is 1000 / client.rateLimit requests per second, without limit if the exchange has no rateLimit.
+    """
+    rate_limit = getattr(client, 'rateLimit', None)
+    if not rate_limit:
+        return _NoRateLimit()
+    key = getattr(client, 'id', None) or client.__class__.__name__
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = RateLimiter(rate=1000 / rate_limit)
+        return _rate_limiters[key]
+
 
 class TradingClient(object):
     ordered: bool = False
@@ -35,6 +153,7 @@ class TradingClient(object):
                 side = 'Buy' if side == 'Sell' else 'Sell'
                 quantity = -quantity
             if self.trading:
+                self._wait_rate_limit('create_order')
                 if side == 'Buy':
                     self.client.create_market_buy_order(symbol=ticker, amount=quantity, params={'reduce_only': reduce_only})  # TODO: add reduceOnly (not reduce_only)
                 elif side == 'Sell':
@@ -51,8 +170,21 @@ class TradingClient(object):
     @utils.wait_success
     def get_ticker_price(self,
                          ticker: str) -> float:
+        self._wait_rate_limit('fetch_ticker')
         return float(self.client.fetch_ticker(symbol=ticker)['close'])
 
+    @utils.wait_success
+    def get_tickers_prices(self,
+                           tickers: Iterable[str]) -> Dict[str, float]:
+        """
+        :return: {ticker: close price} of all -tickers with one request (fetch_tickers).
+        Tickers without a price (close is None for illiquid or just listed symbols) are not returned.
+        """
+        self._wait_rate_limit('fetch_tickers')
+        return {ticker: float(data['close'])
+                for ticker, data in self.client.fetch_tickers(symbols=list(tickers)).items()
+                if data.get('close') is not None}
+
     def new_order_buy(self,
                       ticker: str = None,
                       quantity: float = 0.0,
@@ -82,7 +214,7 @@ class TradingClient(object):
                             ticker: str = None,
                             interval: str = '1m',
                             limit: int = 1000):
-
+        self._wait_rate_limit('fetch_ohlcv')
         frames = self.client.fetch_ohlcv(ticker,
                                          interval,
                                          limit=limit)
@@ -91,6 +223,74 @@ class TradingClient(object):
                                   'Volume'])
         return data.astype(float)
 
+    @utils.wait_success
+    def _fetch_page(self, ticker: str, interval: str, since: int, limit: int) -> np.ndarray:
+        self._wait_rate_limit('fetch_ohlcv')
+        return np.asarray(self.client.fetch_ohlcv(ticker,
+                                                  interval,
+                                                  since=since,
+                                                  limit=limit), dtype=float).reshape(-1, 6)
+
+    def _fetch_pages(self, ticker: str, interval: str, since: int, until: int, limit: int) -> np.ndarray:
+        # every page starts after the last candle of the previous one: exchanges can return less than -limit candles
+        step: int = utils.get_coef_sec(interval)[1] * 1000
+        pages: List[np.ndarray] = [np.empty((0, 6))]
+        while since < until:
+            page = self._fetch_page(ticker=ticker, interval=interval, since=since, limit=limit)
+            if not len(page) or page[-1, 0] < since:  # the end of the history
+                break
+            pages.append(page)
+            since = int(page[-1, 0]) + step
+        return np.concatenate(pages)
+
+    def _wait_rate_limit(self, request: str):
+        rate_limiter(self.client).acquire(request_weight(self.client, request))
+
+    def get_data_historical_range(self,
+                                  ticker: str,
+                                  interval: str = '1m',
+                                  since: Union[int, datetime] = 0,
+                                  until: Union[int, datetime, None] = None,
+                                  limit: int = 1000,
+                                  workers: int = 4) -> DataFrame:
+        """
+        Candles from -since to -until: the range is split into parts of -limit candles, which are fetched
+        by -workers threads. A part is fetched by more requests if the exchange returns shorter pages.
+        Warns if there are holes between the candles.
+
+        :param since: start of the range (timestamp in milliseconds or datetime).
+        :param until: end of the range (exclusive), now by default.
+        :param limit: candles per request.
+        :param workers: number of pages fetched at the same time.
+        """
+        assert isinstance(limit, int) and limit > 0, 'limit must be of type <int> and greater than 0'
+        assert isinstance(workers, int) and workers > 0, 'workers must be of type <int> and greater than 0'
+        if isinstance(since, datetime):
+            since = int(since.timestamp() * 1000)
+        if until is None:
+            until = int(time() * 1000)
+        elif isinstance(until, datetime):
+            until = int(until.timestamp() * 1000)
+
+        step: int = utils.get_coef_sec(interval)[1] * 1000
+        page_length: int = limit * step
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(lambda start: self._fetch_pages(ticker=ticker,
+                                                                      interval=interval,
+                                                                      since=start,
+                                                                      until=min(start + page_length, until),
+                                                                      limit=limit),
+                                      range(since, until, page_length)))
+        candles = np.concatenate([np.empty((0, 6))] + pages)
+        candles = candles[(candles[:, 0] >= since) & (candles[:, 0] < until)]
+        candles = candles[np.unique(candles[:, 0], return_index=True)[1]]  # sorted by time, without repeats
+        holes: int = int(np.sum(np.diff(candles[:, 0]) > 1.5 * step))  # months are not of the same length
+        if holes:
+            warn(f'{holes} holes between the candles of {ticker} {interval}')
+        return DataFrame(candles,
+                         columns=['time', 'Open', 'High', 'Low', 'Close',
+                                  'Volume'])
+
     def exit_last_order(self):
         if self.ordered:
             bet = self.__quantity__
@@ -112,6 +312,7 @@ class TradingClient(object):
 
     @utils.wait_success
     def get_balance(self, currency: str) -> float:
+        self._wait_rate_limit('fetch_balance')
         return self.client.fetch_free_balance()[currency]
 
     @classmethod
@@ -121,3 +322,336 @@ class TradingClient(object):
     @classmethod
     def _sub_order_count(cls):
         cls.cls_open_orders -= 1
+
+
+class PricePoller(object):
+    """
+    Prices of all watched tickers, fetched with one request (TradingClient.get_tickers_prices)
+    every -interval seconds by a background thread and shared by the traders.
+    """
+    prices: Dict[str, float]
+    unpriced: List[str]
+    updated: float
+
+    def __init__(self, client: TradingClient, interval: Union[float, int] = 5):
+        """
+        :param client: client for the requests.
+        :param interval: seconds between the requests.
+        """
+        assert isinstance(interval, (float, int)), 'interval must be of type <float> or <int>'
+        self.client = client
+        self.interval = interval
+        self.tickers: List[str] = []
+        self.prices = {}
+        self.unpriced = []  # tickers of the last poll without a price
+        self.updated = 0.0
+        self._polls = 0
+        self._condition = Condition()
+        self._stop = Event()
+        self._thread: Union[Thread, None] = None
+
+    def watch(self, *tickers: str):
+        with self._condition:
+            for ticker in tickers:
+                if ticker not in self.tickers:
+                    self.tickers.append(ticker)
+
+    def poll(self):
+        with self._condition:
+            tickers = list(self.tickers)
+        prices = self.client.get_tickers_prices(tickers)
+        with self._condition:
+            self.prices.update(prices)
+            self.unpriced = [ticker for ticker in tickers if ticker not in prices]
+            for ticker in self.unpriced:
+                # not the stale price
+                self.prices.pop(ticker, None)
+            self.updated = time()
+            self._polls += 1
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            self.poll()
+            if self._stop.wait(self.interval):
+                break
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def get_price(self, ticker: str) -> float:
+        """
+        :return: the last polled price of -ticker (the ticker is watched from now on).
+        If the ticker is not returned by the poll, the price is requested with TradingClient.get_ticker_price.
+        """
+        self.watch(ticker)
+        if self._thread is None or not self._thread.is_alive():
+            self.poll()
+        with self._condition:
+            polls = self._polls
+            # the next poll could be started before the ticker was watched
+            while ticker not in self.prices and ticker not in self.unpriced and self._polls < polls + 2 and \
+                    self._thread is not None and self._thread.is_alive():
+                self._condition.wait(self.interval)
+            if ticker in self.prices:
+                return self.prices[ticker]
+        return self.client.get_ticker_price(ticker)
+
+
+class AsyncTradingClient(object):
+    """
+    TradingClient with coroutine methods on an async ccxt exchange (ccxt.async_support).
+    Requests of one client are limited by max_concurrency, so many pairs can be polled from one event loop.
+    """
+    ordered: bool = False
+    __side__: str
+    ticker: str
+    cls_open_orders: int = 0
+    base: str
+    quote: str
+    __quantity__: float
+    trading: bool
+
+    def __init__(self, client: AsyncExchange = None, trading: bool = True, max_concurrency: int = 10):
+        assert isinstance(max_concurrency, int) and max_concurrency > 0, \
+            'max_concurrency must be of type <int> and greater than 0'
+        if client is None:
+            client = async_binance()
+        self.client = client
+        self.trading = trading
+        self.max_concurrency = max_concurrency
+        self._semaphore: Union[asyncio.Semaphore, None] = None
+
+    async def _wait_rate_limit(self, request: str):
+        await rate_limiter(self.client).acquire_async(request_weight(self.client, request))
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # created in the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @utils.async_wait_success
+    async def order_create(self,
+                           side: str,
+                           ticker: str = 'None',
+                           quantity: float = 0.0,
+                           counting: bool = True,
+                           reduce_only: bool = False):
+        quote = ticker.split('/')[1]
+        base = ticker.split('/')[0]
+
+        if quantity != 0:
+            if quantity < 0:
+                side = 'Buy' if side == 'Sell' else 'Sell'
+                quantity = -quantity
+            if self.trading:
+                async with self.semaphore:
+                    await self._wait_rate_limit('create_order')
+                    if side == 'Buy':
+                        await self.client.create_market_buy_order(symbol=ticker, amount=quantity, params={'reduce_only': reduce_only})
+                    elif side == 'Sell':
+                        await self.client.create_market_sell_order(symbol=ticker, amount=quantity, params={'reduce_only': reduce_only})
+            self.__side__ = side
+            self.ticker = ticker
+            self.__quantity__ = quantity
+            self.base = base
+            self.quote = quote
+            self.ordered = True
+            if counting:
+                self._add_order_count()
+
+    @utils.async_wait_success
+    async def get_ticker_price(self,
+                               ticker: str) -> float:
+        async with self.semaphore:
+            await self._wait_rate_limit('fetch_ticker')
+            return float((await self.client.fetch_ticker(symbol=ticker))['close'])
+
+    async def new_order_buy(self,
+                            ticker: str = None,
+                            quantity: float = 0.0,
+                            credit_leverage: float = 1.0,
+                            counting: bool = True,
+                            reduce_only: bool = False):
+        await self.order_create(side='Buy',
+                                ticker=ticker,
+                                quantity=quantity * credit_leverage,
+                                counting=counting,
+                                reduce_only=reduce_only)
+
+    async def new_order_sell(self,
+                             ticker: str = None,
+                             quantity: float = 0.0,
+                             credit_leverage: float = 1.0,
+                             counting: bool = True,
+                             reduce_only: bool = False):
+        await self.order_create(side='Sell',
+                                ticker=ticker,
+                                quantity=quantity * credit_leverage,
+                                counting=counting,
+                                reduce_only=reduce_only)
+
+    @utils.async_wait_success
+    async def get_data_historical(self,
+                                  ticker: str = None,
+                                  interval: str = '1m',
+                                  limit: int = 1000):
+        async with self.semaphore:
+            await self._wait_rate_limit('fetch_ohlcv')
+            frames = await self.client.fetch_ohlcv(ticker,
+                                                   interval,
+                                                   limit=limit)
+        data = DataFrame(frames,
+                         columns=['time', 'Open', 'High', 'Low', 'Close',
+                                  'Volume'])
+        return data.astype(float)
+
+    async def get_many_data_historical(self,
+                                       tickers: Iterable[str],
+                                       interval: str = '1m',
+                                       limit: int = 1000) -> Dict[str, DataFrame]:
+        """
+        :return: {ticker: get_data_historical(ticker)}, fetched concurrently (at most max_concurrency requests).
+        """
+        tickers = list(tickers)
+        frames = await asyncio.gather(*[self.get_data_historical(ticker=ticker, interval=interval, limit=limit)
+                                        for ticker in tickers])
+        return dict(zip(tickers, frames))
+
+    async def exit_last_order(self):
+        if self.ordered:
+            bet = self.__quantity__
+            if bet != 0:
+                if self.__side__ == 'Sell':
+                    await self.new_order_buy(self.ticker,
+                                             bet,
+                                             counting=False,
+                                             reduce_only=True)
+                elif self.__side__ == 'Buy':
+                    await self.new_order_sell(self.ticker,
+                                              bet,
+                                              counting=False,
+                                              reduce_only=True)
+            self.__quantity__ = 0
+            self.__side__ = 'Exit'
+            self.ordered = False
+            self._sub_order_count()
+
+    @utils.async_wait_success
+    async def get_balance(self, currency: str) -> float:
+        async with self.semaphore:
+            await self._wait_rate_limit('fetch_balance')
+            return (await self.client.fetch_free_balance())[currency]
+
+    async def close(self):
+        await self.client.close()
+
+    @classmethod
+    def _add_order_count(cls):
+        cls.cls_open_orders += 1
+
+    @classmethod
+    def _sub_order_count(cls):
+        cls.cls_open_orders -= 1
+
+
+class CachedTradingClient(TradingClient):
+    """
+    TradingClient with on-disk candles: every (exchange, ticker, interval) is stored as one .npy file per column
+    in cache_dir/<exchange>/<ticker>/<interval>/, get_data_historical fetches only the candles after the
+    last cached one and returns a DataFrame over the memory-mapped columns.
+    """
+    columns: List[str] = ['time', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+    def __init__(self,
+                 client: Exchange = None,
+                 trading: bool = True,
+                 cache_dir: str = 'quick_trade_cache',
+                 offline: bool = False):
+        """
+        :param cache_dir: directory of the cached candles.
+        :param offline: do not fetch candles, use only the cache.
+        """
+        super().__init__(client=client, trading=trading)
+        self.cache_dir = cache_dir
+        self.offline = offline
+
+    def _cache_path(self, ticker: str, interval: str) -> str:
+        exchange = getattr(self.client, 'id', None) or self.client.__class__.__name__
+        return os.path.join(self.cache_dir, exchange, ticker.replace('/', '_'), interval)
+
+    def _load_cache(self, path: str) -> Dict[str, np.ndarray]:
+        if not all(os.path.exists(os.path.join(path, f'{column}.npy')) for column in self.columns):
+            return {}
+        # copy-on-write: strategies can modify the frame, the files stay unchanged
+        return {column: np.load(os.path.join(path, f'{column}.npy'), mmap_mode='c') for column in self.columns}
+
+    def _save_cache(self, path: str, data: Dict[str, np.ndarray]):
+        os.makedirs(path, exist_ok=True)
+        for column in self.columns:
+            file = os.path.join(path, f'{column}.npy')
+            np.save(file + '.tmp.npy', data[column])
+            os.replace(file + '.tmp.npy', file)
+
+    @utils.wait_success
+    def _fetch_candles(self, ticker: str, interval: str, limit: int, since: int = None) -> np.ndarray:
+        self._wait_rate_limit('fetch_ohlcv')
+        return np.asarray(self.client.fetch_ohlcv(ticker,
+                                                  interval,
+                                                  since=since,
+                                                  limit=limit), dtype=float).reshape(-1, len(self.columns))
+
+    def refresh(self, ticker: str, interval: str = '1m', limit: int = 1000) -> Dict[str, np.ndarray]:
+        """
+        Fetch the candles after the last cached one by pages of up to -limit candles until the current candle
+        (the last cached candle is updated, it could be unclosed). If less than -limit candles are cached, the last -limit candles
+        are fetched too.
+
+        :return: cached columns.
+        """
+        path = self._cache_path(ticker=ticker, interval=interval)
+        cached = self._load_cache(path)
+        new: List[np.ndarray] = []
+        if len(cached):
+            # from the last cached candle without holes, however old it is
+            since = int(cached['time'][-1])
+            step: int = utils.get_coef_sec(interval)[1] * 1000
+            while True:
+                candles = self._fetch_candles(ticker=ticker, interval=interval, limit=limit, since=since)
+                new.append(candles)
+                # pages can be shorter than -limit, the last page has the current candle
+                if not len(candles) or int(candles[-1, 0]) <= since or candles[-1, 0] + step > time() * 1000:
+                    break
+                since = int(candles[-1, 0])
+            candles = np.concatenate(new)
+            old = np.column_stack([cached[column] for column in self.columns])
+            candles = np.concatenate([old[~np.isin(old[:, 0], candles[:, 0])], candles])
+        else:
+            candles = np.empty((0, len(self.columns)))
+        if len(np.unique(candles[:, 0])) < limit:
+            candles = np.concatenate([candles, self._fetch_candles(ticker=ticker, interval=interval, limit=limit)])
+        candles = candles[np.unique(candles[:, 0], return_index=True)[1]]  # sorted by time, without repeats
+        # the files can't be replaced while they are memory-mapped (Windows)
+        del cached
+        self._save_cache(path, {column: np.ascontiguousarray(candles[:, e]) for e, column in enumerate(self.columns)})
+        return self._load_cache(path)
+
+    def get_data_historical(self,
+                            ticker: str = None,
+                            interval: str = '1m',
+                            limit: int = 1000):
+        if self.offline:
+            data = self._load_cache(self._cache_path(ticker=ticker, interval=interval))
+            if not data:
+                raise FileNotFoundError(f'there are no cached candles of {ticker} {interval}')
+        else:
+            data = self.refresh(ticker=ticker, interval=interval, limit=limit)
+        return DataFrame({column: values[-limit:] for column, values in data.items()}, copy=False)
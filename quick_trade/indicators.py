@@ -1,3 +1,9 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
 import numpy as np
 import pandas as pd
 import ta.volatility
@@ -5,11 +11,164 @@ from numpy import nan
 from pandas import DataFrame
 from pandas import Series
 from ta.volatility import AverageTrueRange
+from . import utils
 from .utils import BUY, SELL
 from typing import Union
 
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, (Series, DataFrame, np.ndarray)):
+        return value.copy()
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return {key: _copy(val) for key, val in value.items()}
+    return value
+
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, (Series, DataFrame)):
+        return int(np.sum(value.memory_usage(index=True, deep=True)))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(sys.getsizeof(val) for val in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(val) for val in value.values())
+    return sys.getsizeof(value)
+
+
+_SCALARS: Tuple[type, ...] = (type(None), bool, int, float, complex, str, bytes, np.generic)
+
+
+def _identity(value: Any) -> Union[tuple, None]:
+    # the data is identified by the hash of the values, not by the (truncated) repr
+    if isinstance(value, Series):
+        return 'series', utils.frame_fingerprint(value.to_frame(name=0), index=True)
+    if isinstance(value, DataFrame):
+        return 'frame', tuple(map(repr, value.columns)), utils.frame_fingerprint(value, index=True)
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return None
+        digest = hashlib.blake2b(np.ascontiguousarray(value).reshape(-1).view(np.uint8), digest_size=16)
+        return 'array', value.dtype.str, value.shape, digest.hexdigest()
+    if isinstance(value, _SCALARS):
+        return type(value).__name__, repr(value)
+    if isinstance(value, (tuple, list)):
+        items = tuple(map(_identity, value))
+        return None if None in items else (type(value).__name__, items)
+    if isinstance(value, dict):
+        items = tuple((_identity(key), _identity(val)) for key, val in value.items())
+        return None if any(None in item for item in items) else ('dict', tuple(sorted(items, key=repr)))
+    return None
+
+
+class IndicatorCache(object):
+    """
+    LRU cache of the values of indicators by (fingerprint of the input series, indicator, parameters).
+
+    The least recently used values are evicted when the cache is bigger than max_bytes
+    (utils.INDICATOR_CACHE_BYTES by default), the values are copied, so the callers can change them.
+    """
+    max_bytes: Union[int, None]
+    nbytes: int
+    hits: int
+    misses: int
+
+    def __init__(self, max_bytes: Union[int, None] = None):
+        self.max_bytes = max_bytes
+        self._values: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    @staticmethod
+    def key(name: str, params: Dict[str, Any]) -> Union[tuple, None]:
+        """
+        :return: key of the values or None if some of the arguments can't be identified (the values aren't cached).
+        """
+        identities = []
+        for arg, value in sorted(params.items()):
+            identity = _identity(value)
+            if identity is None:
+                return None
+            identities.append((arg, identity))
+        return name, tuple(identities)
+
+    def get(self, name: str, compute: Callable[[], Any], params: Dict[str, Any]) -> Any:
+        """
+        :param name: name of the indicator.
+        :param compute: function without arguments, which calculates the values of the indicator.
+        :param params: arguments of the indicator (series, arrays and scalars).
+        """
+        key = self.key(name=name, params=params)
+        if key is None:
+            return compute()
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return _copy(self._values[key][0])
+            self.misses += 1
+        value = compute()
+        nbytes = _nbytes(value)
+        max_bytes = utils.INDICATOR_CACHE_BYTES if self.max_bytes is None else self.max_bytes
+        with self._lock:
+            if key not in self._values and nbytes <= max_bytes:
+                self._values[key] = value, nbytes
+                self.nbytes += nbytes
+                while self.nbytes > max_bytes:
+                    _, (_, evicted) = self._values.popitem(last=False)
+                    self.nbytes -= evicted
+        return _copy(value)
+
+
+INDICATOR_CACHE: IndicatorCache = IndicatorCache()
+
+
+def cached(indicator: Callable, *series: Series, outputs: Tuple[str, ...] = (), **params) -> Union[Series, DataFrame]:
+    """
+    Values of a ta indicator through INDICATOR_CACHE.
+
+    :param indicator: function (ta.trend.sma_indicator) or class (ta.trend.MACD) of the indicator.
+    :param series: input series (positional arguments of the indicator).
+    :param outputs: methods of the instance of the class -> DataFrame with these columns.
+    :param params: other (named) arguments of the indicator.
+    """
+    def compute():
+        values = indicator(*series, **params)
+        if outputs:
+            return DataFrame({output: getattr(values, output)() for output in outputs})
+        return values
+
+    return INDICATOR_CACHE.get(name=f'{indicator.__module__}.{indicator.__qualname__}{outputs}',
+                               compute=compute,
+                               params={**{f'*{e}': values for e, values in enumerate(series)}, **params})
+
+
 class Indicator:
-    pass
+    def _run(self):
+        pass
+
+    def _run_cached(self):
+        # the attributes set by _run are cached by the attributes of the instance before _run
+        before: Dict[str, Any] = dict(vars(self))
+
+        def compute() -> Dict[str, Any]:
+            self._run()
+            return {name: value for name, value in vars(self).items() if name not in before}
+
+        vars(self).update(INDICATOR_CACHE.get(
+            name=f'{type(self).__module__}.{type(self).__qualname__}',
+            compute=compute,
+            params=before
+        ))
 
 class SuperTrendIndicator(Indicator):
     """
@@ -31,6 +190,9 @@ class SuperTrendIndicator(Indicator):
         self.low = low
         self.multiplier: float = multiplier
         self.length = length
+        self._run_cached()
+
+    def _run(self):
         self._all = self._get_all_ST()
 
     def get_supertrend(self) -> Series:
@@ -102,7 +264,7 @@ class PriceChannel(Indicator):
         self._high = high
         self._low = low
         self._part = channel_part
-        self._run()
+        self._run_cached()
 
     @staticmethod
     def _run_lev(func, period, prices):
@@ -156,7 +318,7 @@ class ATRMultiplier(Indicator):
         self._close = close
         self._window = window
         self._multiplier_window = multiplier_window
-        self._run()
+        self._run_cached()
 
     def _run(self):
         ATR = ta.volatility.average_true_range(high=self._high,
@@ -182,18 +344,24 @@ class AdaptivePriceChannel(PriceChannel):
                  channel_part: float = 1.0,
                  atr_window: int = 14,
                  multiplier_window: int = 30):
-        atr_multiplier = ATRMultiplier(high=high,
-                                       low=low,
-                                       close=close,
-                                       window=atr_window,
-                                       multiplier_window=multiplier_window)
-        self._multipliers = atr_multiplier.multiplier_by_average_true_range()
+        self._close = close
+        self._atr_window = atr_window
+        self._multiplier_window = multiplier_window
         super().__init__(high=high,
                          low=low,
                          support_period=support_period,
                          resistance_period=resistance_period,
                          channel_part=channel_part)
 
+    def _run(self):
+        atr_multiplier = ATRMultiplier(high=self._high,
+                                       low=self._low,
+                                       close=self._close,
+                                       window=self._atr_window,
+                                       multiplier_window=self._multiplier_window)
+        self._multipliers = atr_multiplier.multiplier_by_average_true_range()
+        super()._run()
+
     def _run_lev(self, func, period, prices):
         channel = []
         for i, coef in enumerate(self._multipliers):
@@ -5,6 +5,7 @@ from typing import Iterable
 from typing import List
 from typing import Union
 
+import numpy as np
 from plotly.graph_objs import Figure
 from plotly.graph_objs import Scatter
 from plotly.subplots import make_subplots
@@ -214,35 +215,38 @@ class TraderGraph(BasePlotlyGraph):
                        _col=self.data_col)
 
     def plot_trade_triangles(self):
-        loc = self.trader.df['Close']
-        preds: Dict[str, List[Union[int, float]]] = {
-            'sellind': [],
-            'exitind': [],
-            'buyind': [],
-            'bprice': [],
-            'sprice': [],
-            'eprice': []
+        length = min(len(self.trader.returns),
+                     len(self.trader.credit_leverages),
+                     len(self.trader.df))
+        loc = self.trader.df['Close'].values[:length]
+        signals = utils.signals_to_array(self.trader.returns)[:length]
+        leverages = np.asarray(self.trader.credit_leverages[:length], dtype=float)
+
+        new_signal = np.ones(length, dtype=bool)
+        new_signal[1:] = signals[1:] != signals[:-1]
+        new_leverage = np.ones(length, dtype=bool)
+        new_leverage[1:] = leverages[1:] != leverages[:-1]
+        credlev_up = np.zeros(length, dtype=bool)
+        credlev_up[1:] = leverages[:-1] < leverages[1:]
+        credlev_down = np.zeros(length, dtype=bool)
+        credlev_down[1:] = leverages[:-1] > leverages[1:]
+
+        buy_signal = signals == utils.BUY.value
+        sell_signal = signals == utils.SELL.value
+        sell = (credlev_down & buy_signal) | (credlev_up & sell_signal)
+        buy = (credlev_down & sell_signal) | (credlev_up & buy_signal)
+
+        exits = (new_signal & (signals == utils.EXIT.value)) | (new_leverage & (leverages == 0))
+        sells = ~exits & ((new_signal & sell_signal) | sell)
+        buys = ~exits & ~sells & ((new_signal & buy_signal) | buy)
+        preds: Dict[str, np.ndarray] = {
+            'sellind': np.flatnonzero(sells),
+            'exitind': np.flatnonzero(exits),
+            'buyind': np.flatnonzero(buys),
+            'bprice': loc[buys],
+            'sprice': loc[sells],
+            'eprice': loc[exits]
         }
-        for e, (pred, conv, crlev) in enumerate(zip(self.trader.returns,
-                                                    self.trader._converted,
-                                                    utils.convert(self.trader.credit_leverages))):
-            if e != 0:
-                credlev_up = self.trader.credit_leverages[e - 1] < self.trader.credit_leverages[e]
-                credlev_down = self.trader.credit_leverages[e - 1] > self.trader.credit_leverages[e]
-                sell = (credlev_down and pred == utils.BUY) or (credlev_up and pred == utils.SELL)
-                buy = (credlev_down and pred == utils.SELL) or (credlev_up and pred == utils.BUY)
-            else:
-                sell = buy = False
-
-            if conv == utils.EXIT or crlev == 0:
-                preds['exitind'].append(e)
-                preds['eprice'].append(loc[e])
-            elif conv == utils.SELL or sell:
-                preds['sellind'].append(e)
-                preds['sprice'].append(loc[e])
-            elif conv == utils.BUY or buy:
-                preds['buyind'].append(e)
-                preds['bprice'].append(loc[e])
         name: str
         index: List[Union[int, float]]
         price: List[Union[int, float]]
@@ -18,7 +18,7 @@ from datetime import datetime
 from re import fullmatch
 from threading import Thread
 from time import ctime, sleep, time
-from typing import Any, Union, List, Iterable, Tuple, Dict
+from typing import Any, Union, List, Iterable, Iterator, Tuple, Dict, Sized
 from warnings import warn
 
 import numpy as np
@@ -29,14 +29,14 @@ import ta.volatility
 
 from . import indicators
 from . import utils
-from .brokers import TradingClient
+from .brokers import PricePoller, TradingClient
 from .plots import TraderGraph
 from .utils import strategy
 
 
 class Trader(object):
     _profit_calculate_coef: Union[float, int]
-    returns: utils.PREDICT_TYPE_LIST = []
+    returns: Union[utils.SignalArray, utils.PREDICT_TYPE_LIST] = []
     _df: pd.DataFrame
     ticker: str
     interval: str
@@ -53,7 +53,7 @@ class Trader(object):
     deposit_history: List[Union[float, int]] = []
     year_profit: float
     _info: str
-    backtest_out: pd.DataFrame
+    backtest_out: pd.DataFrame | None
     open_lot_prices: List[float] = []
     client: TradingClient
     __last_stop_loss: float
@@ -64,29 +64,51 @@ class Trader(object):
     fig: TraderGraph
     _multi_converted_: bool = False
     _entry_start_trade: bool
-    average_growth: Union[np.ndarray, List]
+    average_growth: Union[np.ndarray, List, None]
     _converted: utils.CONVERTED_TYPE_LIST
     mean_deviation: float
     sharpe_ratio: float
     sortino_ratio: float
     max_drawdown: float
     calmar_ratio: float
-    net_returns: pd.Series
+    net_returns: pd.Series | None
     profit_deviation_ratio: float
     _registered_strategy: str
+    stream: utils.StreamingBacktest | None = None
+    metrics: utils.OnlineMetrics | None = None
+    price_poller: PricePoller | None = None
+    ledger: np.ndarray
+    dtype: np.dtype = np.dtype(np.float64)
+    _strategy_depth: int = 0
 
     def returns_update(self):
         self._converted = utils.convert(self.returns)
 
-    def deposit_history_update(self):
+    def deposit_history_update(self, additional: bool = True):
+        """
+        :param additional: also set utils.ADDITIONAL_TRADER_ATTRIBUTES (pd.Series and arrays of the deposit's length),
+        else they are set to None.
+        """
         all_characteristics = utils.strategy_characteristics(equity=self.deposit_history,
                                                              trades=self.trades,
                                                              profit_trades=self.profits,
-                                                             timeframe=self.interval)
-        self.average_growth = utils.get_exponential_growth(self.deposit_history)
-        for name, param in {**utils.TUNER_CODECONF,
-                            **utils.ADDITIONAL_TRADER_ATTRIBUTES}.items():
+                                                             timeframe=self.interval,
+                                                             additional=additional)
+        attributes = utils.TUNER_CODECONF
+        if additional:
+            attributes = {**attributes, **utils.ADDITIONAL_TRADER_ATTRIBUTES}
+        for name, param in attributes.items():
             setattr(self, param, all_characteristics[name])
+        self._apply_dtype('deposit_history')
+        if additional:
+            self._apply_dtype(*utils.ADDITIONAL_TRADER_ATTRIBUTES.values())
+        else:
+            # the values of an earlier backtest would not match the new deposit history
+            for param in utils.ADDITIONAL_TRADER_ATTRIBUTES.values():
+                setattr(self, param, None)
+
+    def _tuner_characteristics(self) -> Dict[str, Any]:
+        return {name: self._get_attr(param) for name, param in utils.TUNER_CODECONF.items()}
 
     @property
     def df(self) -> pd.DataFrame:
@@ -94,8 +116,32 @@ class Trader(object):
 
     @df.setter
     def df(self, frame: pd.DataFrame):
+        if self.dtype != np.float64:
+            frame = frame.astype({column: self.dtype for column in utils.OHLCV_COLUMNS if column in frame})
         self._df = frame
 
+    def set_dtype(self, dtype: Union[str, type, np.dtype]):
+        """
+        :param dtype: np.float64 or np.float32 for the OHLCV columns and the per-candle data (see Trader.dtype).
+        """
+        assert np.dtype(dtype) in utils.FLOAT_DTYPES, 'dtype must be <float64> or <float32>'
+        if np.dtype(dtype) != self.dtype:
+            self.dtype = np.dtype(dtype)
+            self._df = self.df.astype({column: self.dtype for column in utils.OHLCV_COLUMNS if column in self.df})
+
+    def _apply_dtype(self, *attributes: str):
+        """
+        Store per-candle data (lists, arrays or pd.Series) as Trader.dtype arrays, if it is not np.float64.
+        """
+        if self.dtype == np.float64:
+            return
+        for attribute in attributes:
+            values = getattr(self, attribute)
+            if isinstance(values, pd.Series):
+                setattr(self, attribute, values.astype(self.dtype))
+            else:
+                setattr(self, attribute, np.asarray(values, dtype=self.dtype))
+
     @property
     def _info(self):
         return utils.INFO_TEXT.format(self.losses,
@@ -113,12 +159,16 @@ class Trader(object):
     def __init__(self,
                  ticker: str = 'BTC/USDT',
                  df: pd.DataFrame = pd.DataFrame(),
-                 interval: str = '1d'):
+                 interval: str = '1d',
+                 dtype: Union[str, type, np.dtype, None] = None):
         ticker = ticker.upper()
         assert isinstance(ticker, str), 'The ticker can only be of type <str>.'
         assert fullmatch(utils.TICKER_PATTERN, ticker), f'Ticker must match the pattern <{utils.TICKER_PATTERN}>'
         assert isinstance(df, pd.DataFrame), 'Dataframe can only be of type <DataFrame>.'
         assert isinstance(interval, str), 'interval can only be of the <str> type.'
+        if dtype is not None:
+            assert np.dtype(dtype) in utils.FLOAT_DTYPES, 'dtype must be <float64> or <float32>'
+            self.dtype = np.dtype(dtype)
 
         self.df = df.reset_index(drop=True)
         self.ticker = ticker
@@ -135,37 +185,31 @@ class Trader(object):
     def _get_this_instance(cls, *args, **kwargs):
         return cls(*args, **kwargs)
 
-    def __get_stop_take(self, sig: utils.PREDICT_TYPE) -> Dict[str, float]:
+    def __get_stop_take(self, signals: np.ndarray, open_prices: np.ndarray) -> Dict[str, np.ndarray]:
         """
-        calculating stop loss and take profit.
-        sig:        |     PREDICT_TYPE     |  signal to sell/buy/exit:
-            EXIT -- exit.
+        calculating stop losses and take profits.
+        signals:        |     np.ndarray     |  values of signals to sell/buy/exit:
+            EXIT -- exit (stop loss and take profit are equal to the open price).
             BUY -- buy.
             SELL -- sell.
+        open_prices:    |     np.ndarray     |  open price of the trade at every candle
         """
 
-        _stop_loss: float
-        take: float
+        _stop_loss: np.ndarray
+        take: np.ndarray
         if self._stop_loss is not np.inf:
-            _stop_loss = self._stop_loss / 10_000 * self._open_price
+            _stop_loss = self._stop_loss / 10_000 * open_prices
         else:
-            _stop_loss = np.inf
+            _stop_loss = np.full(len(open_prices), np.inf)
         if self._take_profit is not np.inf:
-            take = self._take_profit / 10_000 * self._open_price
-        else:
-            take = np.inf
-
-        if sig == utils.BUY:
-            _stop_loss = self._open_price - _stop_loss
-            take = self._open_price + take
-        elif sig == utils.SELL:
-            take = self._open_price - take
-            _stop_loss = self._open_price + _stop_loss
+            take = self._take_profit / 10_000 * open_prices
         else:
-            if self._take_profit is not np.inf:
-                take = self._open_price
-            if self._stop_loss is not np.inf:
-                _stop_loss = self._open_price
+            take = np.full(len(open_prices), np.inf)
+
+        buy = signals == utils.BUY.value
+        exit_ = signals == utils.EXIT.value
+        _stop_loss = np.where(exit_, open_prices, np.where(buy, open_prices - _stop_loss, open_prices + _stop_loss))
+        take = np.where(exit_, open_prices, np.where(buy, open_prices + take, open_prices - take))
 
         return {'stop': _stop_loss,
                 'take': take}
@@ -234,14 +278,13 @@ class Trader(object):
         assert isinstance(fast, Iterable) and isinstance(slow, Iterable), \
             'The arguments to this function must be iterable.'
 
-        self.returns = []
-        for s, f in zip(slow, fast):
-            if s < f:
-                self.returns.append(utils.BUY)
-            elif s > f:
-                self.returns.append(utils.SELL)
-            else:
-                self.returns.append(utils.EXIT)
+        slow, fast = (np.asarray(values if isinstance(values, Sized) else list(values), dtype=np.float64)
+                      for values in (slow, fast))
+        length: int = min(len(slow), len(fast))
+        slow, fast = slow[:length], fast[:length]
+        self.returns = utils.SignalArray(np.select([slow < fast, slow > fast],
+                                                   [utils.BUY.value, utils.SELL.value],
+                                                   utils.EXIT.value))
         self.set_credit_leverages()
         self.set_open_stop_and_take()
         return self.returns
@@ -255,52 +298,41 @@ class Trader(object):
         """
         assert isinstance(swap_stop_take, bool), 'swap_stop_take can only be <bool>'
 
-        returns = []
-        flag: utils.PREDICT_TYPE = utils.EXIT
-        for signal_key in self.returns:
-            if signal_key == utils.BUY:
-                flag = utils.SELL
-            elif signal_key == utils.SELL:
-                flag = utils.BUY
-            elif signal_key == utils.EXIT:
-                flag = utils.EXIT
-            returns.append(flag)
-        self.returns = returns
+        if isinstance(self.returns, utils.SignalArray):
+            self.returns = utils.SignalArray(-self.returns.values)
+        else:
+            returns = []
+            flag: utils.PREDICT_TYPE = utils.EXIT
+            for signal_key in self.returns:
+                if signal_key == utils.BUY:
+                    flag = utils.SELL
+                elif signal_key == utils.SELL:
+                    flag = utils.BUY
+                elif signal_key == utils.EXIT:
+                    flag = utils.EXIT
+                returns.append(flag)
+            self.returns = returns
         self.returns_update()
         if swap_stop_take:
             self.stop_losses, self.take_profits = self.take_profits, self.stop_losses
         return self.returns
 
-    def backtest(self,
-                 deposit: Union[float, int] = 10_000.0,
-                 bet: Union[float, int] = np.inf,
-                 commission: Union[float, int] = 0.0,
-                 plot: bool = True,
-                 print_out: bool = True,
-                 show: bool = True) -> pd.DataFrame:
-        """
-        testing the strategy.
-        :param deposit: start deposit.
-        :param bet: fixed bet to backtest. np.inf = all deposit.
-        :param commission: percentage commission (0 -- 100).
-        :param plot: plotting.
-        :param print_out: printing.
-        :param show: show the graph
-        returns: pd.DataFrame with data of test
-        """
-        assert isinstance(deposit, (float, int)), 'deposit must be of type <int> or <float>'
-        assert deposit > 0, 'deposit can\'t be 0 or less'
-        assert isinstance(bet, (float, int)), 'bet must be of type <int> or <float>'
-        assert bet > 0, 'bet can\'t be 0 or less'
-        assert isinstance(commission, (float, int)), 'commission must be of type <int> or <float>'
-        assert 0 <= commission < 100, 'commission cannot be >=100% or less then 0'
-        assert isinstance(plot, bool), 'plot must be of type <bool>'
-        assert isinstance(print_out, bool), 'print_out must be of type <bool>'
-        assert isinstance(show, bool), 'show must be of type <bool>'
-
-        self.returns_update()
+    def _backtest_loop(self,
+                       deposit: Union[float, int],
+                       bet: Union[float, int],
+                       commission: Union[float, int],
+                       ledger: bool = False) -> bool:
         pass_math: bool = False
-        data_column: pd.Series = self.df['Close']
+        trades_ledger: List[Tuple[Any, ...]] = []
+        entry_index: int = 0
+        entry_lev: Union[float, int] = 1.0
+        trade_commission: float = 0.0
+        closing_commission: float
+        exit_price: float = np.nan
+        exit_index: int = 0
+        data_column: List[float] = self.df['Close'].tolist()
+        returns: utils.PREDICT_TYPE_LIST = list(self.returns)
+        converted: utils.CONVERTED_TYPE_LIST = list(self._converted)
         exit_take_stop: bool
         no_order: bool
         stop_loss: float
@@ -312,8 +344,12 @@ class Trader(object):
         credit_lev: Union[float, int]
 
         start_bet: Union[float, int] = bet
-        data_high: pd.Series = self.df['High']
-        data_low: pd.Series = self.df['Low']
+        data_high: List[float] = self.df['High'].tolist()
+        data_low: List[float] = self.df['Low'].tolist()
+        # python floats: np.float32 data (Trader.dtype) must not lower the precision of the deposit
+        stop_losses: List[float] = np.asarray(self.stop_losses, dtype=np.float64).tolist()
+        take_profits: List[float] = np.asarray(self.take_profits, dtype=np.float64).tolist()
+        credit_leverages: List[float] = np.asarray(self.credit_leverages, dtype=np.float64).tolist()
         self.deposit_history = [deposit]
         self.trades = 0
         self.profits = 0
@@ -342,17 +378,18 @@ class Trader(object):
                 high,
                 low,
                 next_h,
-                next_l) in enumerate(zip(self.returns[:-1],
-                                         self.stop_losses[:-1],
-                                         self.take_profits[:-1],
-                                         self._converted[:-1],
-                                         self.credit_leverages[:-1],
+                next_l) in enumerate(zip(returns[:-1],
+                                         stop_losses[:-1],
+                                         take_profits[:-1],
+                                         converted[:-1],
+                                         credit_leverages[:-1],
                                          data_high[:-1],
                                          data_low[:-1],
                                          data_high[1:],
                                          data_low[1:])):
 
-            if converted_element is not np.nan:
+            if not utils.is_nan(converted_element):
+                closing_commission = 0.0
                 # count the number of profitable and unprofitable trades.
                 if prev_sig != utils.EXIT:
                     self.trades += 1
@@ -360,13 +397,29 @@ class Trader(object):
                         self.profits += 1
                     elif deposit < moneys_open_bet:
                         self.losses += 1
+                    # the first commission of utils.apply_commission closes the previous trade
+                    closing_commission = min(start_bet, deposit) * (commission / 100) * credit_lev
+                    trades_ledger.append((entry_index,
+                                          e if np.isnan(exit_price) else exit_index,
+                                          prev_sig.value,
+                                          open_price,
+                                          data_column[e] if np.isnan(exit_price) else exit_price,
+                                          entry_lev,
+                                          deposit - closing_commission - moneys_open_bet,
+                                          trade_commission + closing_commission))
 
                 # calculating commission
+                trade_commission = deposit
                 bet, deposit = utils.apply_commission(deposit=deposit,
                                                       pct_commission=commission,
                                                       prev_trade=prev_sig,
                                                       bet=start_bet,
                                                       leverage=credit_lev)
+                trade_commission -= deposit
+                trade_commission -= closing_commission
+                entry_index = e
+                entry_lev = credit_lev
+                exit_price = np.nan
 
                 # reset service variables
                 open_price = data_column[e]
@@ -382,15 +435,17 @@ class Trader(object):
             if sig != utils.EXIT:
                 next_not_breakout = min(stop_loss, take_profit) < next_l <= next_h < max(stop_loss, take_profit)
 
-                stop_loss = self.stop_losses[e - 1]
-                take_profit = self.take_profits[e - 1]
+                stop_loss = stop_losses[e - 1]
+                take_profit = take_profits[e - 1]
                 # be careful with e=0
                 now_not_breakout = min(stop_loss, take_profit) < low <= high < max(stop_loss, take_profit)
 
                 normal = ignore_breakout or (now_not_breakout and next_not_breakout)
 
-                if credit_lev != self.credit_leverages[e - 1] and not ignore_breakout:
-                    deposit -= bet * (commission / 100) * abs(self.credit_leverages[e - 1] - credit_lev)
+                if credit_lev != credit_leverages[e - 1] and not ignore_breakout:
+                    change_commission = bet * (commission / 100) * abs(credit_leverages[e - 1] - credit_lev)
+                    deposit -= change_commission
+                    trade_commission += change_commission
                     # Commission when changing the leverage.
                     if bet > deposit:
                         bet = deposit
@@ -402,7 +457,19 @@ class Trader(object):
                                 self.profits += 1
                             elif deposit < moneys_open_bet:
                                 self.losses += 1
+                            trades_ledger.append((entry_index,
+                                                  e if np.isnan(exit_price) else exit_index,
+                                                  sig.value,
+                                                  open_price,
+                                                  data_column[e] if np.isnan(exit_price) else exit_price,
+                                                  entry_lev,
+                                                  deposit - moneys_open_bet,
+                                                  trade_commission))
                         moneys_open_bet = deposit
+                        entry_index = e
+                        entry_lev = credit_lev
+                        # the commission of the change is charged to the closed part of the trade
+                        trade_commission = change_commission if prev_sig == utils.EXIT else 0.0
 
                 if normal:
                     diff = data_column[e + 1] - data_column[e]
@@ -413,8 +480,8 @@ class Trader(object):
                     exit_take_stop = True
 
                     if (not now_not_breakout) and not ignore_breakout:
-                        stop_loss = self.stop_losses[e - 1]
-                        take_profit = self.take_profits[e - 1]
+                        stop_loss = stop_losses[e - 1]
+                        take_profit = take_profits[e - 1]
                         diff = utils.get_diff(price=data_column[e],
                                               low=low,
                                               high=high,
@@ -423,14 +490,18 @@ class Trader(object):
                                               signal=sig)
 
                     elif not next_not_breakout:
-                        stop_loss = self.stop_losses[e]
-                        take_profit = self.take_profits[e]
+                        stop_loss = stop_losses[e]
+                        take_profit = take_profits[e]
                         diff = utils.get_diff(price=data_column[e],
                                               low=next_l,
                                               high=next_h,
                                               stop_loss=stop_loss,
                                               take_profit=take_profit,
                                               signal=sig)
+                    if np.isnan(exit_price):
+                        exit_price = data_column[e] + diff
+                        # the candle where the stop loss / take profit was reached
+                        exit_index = e if (not now_not_breakout) and not ignore_breakout else e + 1
             else:
                 diff = 0.0
             if sig == utils.SELL:
@@ -442,11 +513,282 @@ class Trader(object):
             self.deposit_history.append(deposit)
 
             no_order = exit_take_stop
-            if self.returns[e + 1] != sig:
+            if returns[e + 1] != sig:
                 prev_sig = sig
             ignore_breakout = False
+        if ledger:
+            self.ledger = np.array(trades_ledger, dtype=utils.LEDGER_DTYPE)
+        return pass_math
+
+    def _backtest_vectorized(self,
+                             deposit: Union[float, int],
+                             bet: Union[float, int],
+                             commission: Union[float, int],
+                             ledger: bool = False) -> bool:
+        """
+        The same test as Trader._backtest_loop, calculated by utils.backtest_arrays.
+        """
+        length: int = min(len(self.returns),
+                          len(self.stop_losses),
+                          len(self.take_profits),
+                          len(self.credit_leverages),
+                          len(self.df))
+        equity, trades, profits, losses, lengths, *ledgers = utils.backtest_arrays(
+            signals=utils.signals_to_array(self.returns[:length])[None],
+            stop_losses=np.asarray(self.stop_losses[:length], dtype=np.float64)[None],
+            take_profits=np.asarray(self.take_profits[:length], dtype=np.float64)[None],
+            leverages=np.asarray(self.credit_leverages[:length], dtype=np.float64)[None],
+            close=self.df['Close'].values[:length].astype(np.float64),
+            high=self.df['High'].values[:length].astype(np.float64),
+            low=self.df['Low'].values[:length].astype(np.float64),
+            deposit=deposit,
+            bet=bet,
+            commission=commission,
+            multi_trades=self._multi_converted_,
+            ledger=ledger
+        )
+        if ledger:
+            self.ledger = ledgers[0][0]
+        self.deposit_history = equity[0, :lengths[0]].tolist()
+        self.trades = int(trades[0])
+        self.profits = int(profits[0])
+        self.losses = int(losses[0])
+        return bool(lengths[0] < length)
+
+    def _stream_bars(self) -> Iterator[Tuple[Any, ...]]:
+        return zip(self.df['Close'].values,
+                   self.df['High'].values,
+                   self.df['Low'].values,
+                   self.returns,
+                   self.stop_losses,
+                   self.take_profits,
+                   self.credit_leverages)
+
+    def _backtest_stream(self,
+                         deposit: Union[float, int],
+                         bet: Union[float, int],
+                         commission: Union[float, int],
+                         ledger: bool = False) -> bool:
+        """
+        The same test as Trader._backtest_loop, calculated by utils.StreamingBacktest.
+        """
+        stream = utils.StreamingBacktest(deposit=deposit,
+                                         bet=bet,
+                                         commission=commission,
+                                         multi_trades=self._multi_converted_,
+                                         ledger=ledger)
+        self.deposit_history = list(stream.run(self._stream_bars()))
+        if ledger:
+            self.ledger = stream.ledger
+        self.trades = stream.trades
+        self.profits = stream.profits
+        self.losses = stream.losses
+        return stream.pass_math
+
+    def backtest_stream(self,
+                        bars: Iterable[Tuple[Any, ...]] | None = None,
+                        deposit: Union[float, int] = 10_000.0,
+                        bet: Union[float, int] = np.inf,
+                        commission: Union[float, int] = 0.0) -> Iterator[float]:
+        """
+        testing the strategy candle by candle without keeping the history.
+        :param bars: iterable of (close, high, low, signal, stop loss, take profit, credit leverage).
+        None -- candles of self.df with the current strategy.
+        :param deposit: start deposit.
+        :param bet: fixed bet to backtest. np.inf = all deposit.
+        :param commission: percentage commission (0 -- 100).
+        returns: iterator of deposits (one for every candle).
+        """
+        assert isinstance(deposit, (float, int)), 'deposit must be of type <int> or <float>'
+        assert deposit > 0, 'deposit can\'t be 0 or less'
+        assert isinstance(bet, (float, int)), 'bet must be of type <int> or <float>'
+        assert bet > 0, 'bet can\'t be 0 or less'
+        assert isinstance(commission, (float, int)), 'commission must be of type <int> or <float>'
+        assert 0 <= commission < 100, 'commission cannot be >=100% or less then 0'
+
+        if bars is None:
+            bars = self._stream_bars()
+        stream = utils.StreamingBacktest(deposit=deposit,
+                                         bet=bet,
+                                         commission=commission,
+                                         multi_trades=self._multi_converted_)
+        self.trades = self.profits = self.losses = 0
+        for equity in stream.run(bars):
+            self.trades = stream.trades
+            self.profits = stream.profits
+            self.losses = stream.losses
+            yield equity
+        if stream.pass_math:
+            warn('The deal was opened out of range!')
+
+    def __chunk_bar(self, index: int) -> np.ndarray:
+        return np.array([utils.signals_to_array(self.returns[index:index + 1])[0],
+                         self.credit_leverages[index],
+                         self.stop_losses[index],
+                         self.take_profits[index]], dtype=np.float64)
+
+    def __check_chunk_bar(self, last_bar: np.ndarray, index: int, candles: int, closed: bool):
+        # the stop loss and the take profit don't matter after the trade was closed by them
+        compare: int = 1 if last_bar[0] == utils.EXIT.value else 2 if closed else 4
+        if not np.allclose(self.__chunk_bar(index)[:compare], last_bar[:compare], rtol=1e-9, atol=0.0, equal_nan=True):
+            raise ValueError(f'warmup is too short: the strategy differs at the candle {candles - 1} with the '
+                             f'previous chunk (an open trade or an indicator is longer than warmup)')
+
+    def backtest_chunks(self,
+                        chunks: Union[str, Iterable[pd.DataFrame]],
+                        strategy,
+                        warmup: int = 0,
+                        chunk_size: int = 100_000,
+                        deposit: Union[float, int] = 10_000.0,
+                        bet: Union[float, int] = np.inf,
+                        commission: Union[float, int] = 0.0,
+                        equity_step: int = 0,
+                        **strategy_kwargs) -> Dict[str, Any]:
+        """
+        testing the strategy on OHLCV data that is read by parts (the memory depends on chunk_size, not on the history).
+        The last candle of the previous chunk is tested again with the new one: if its signal, stop loss, take profit
+        or credit leverage differs, warmup is too short and ValueError is raised.
+        :param chunks: path to csv file with OHLCV columns or iterable of OHLCV dataframes.
+        :param strategy: trading strategy (method of this trader), called for every chunk.
+        :param warmup: number of the previous candles added to every chunk. It must cover the longest window of
+        the indicators and the longest trade of the strategy (stop losses and take profits depend on the open price).
+        :param chunk_size: number of candles in one chunk of csv file.
+        :param deposit: start deposit.
+        :param bet: fixed bet to backtest. np.inf = all deposit.
+        :param commission: percentage commission (0 -- 100).
+        :param equity_step: keep the deposit of every equity_step-th candle. 0 -- without deposit history.
+        :param strategy_kwargs: named arguments to -strategy.
+        returns: dict with deposit, trades, profits, losses, winrate, max drawdown, number of candles and equity.
+        """
+        assert isinstance(chunks, (str, Iterable)), 'chunks must be of type <str> or <Iterable[pd.DataFrame]>'
+        assert isinstance(warmup, int), 'warmup must be of type <int>'
+        assert warmup >= 0, 'warmup can\'t be less than 0'
+        assert isinstance(chunk_size, int), 'chunk_size must be of type <int>'
+        assert chunk_size > 0, 'chunk_size can\'t be 0 or less'
+        assert isinstance(deposit, (float, int)), 'deposit must be of type <int> or <float>'
+        assert deposit > 0, 'deposit can\'t be 0 or less'
+        assert isinstance(bet, (float, int)), 'bet must be of type <int> or <float>'
+        assert bet > 0, 'bet can\'t be 0 or less'
+        assert isinstance(commission, (float, int)), 'commission must be of type <int> or <float>'
+        assert 0 <= commission < 100, 'commission cannot be >=100% or less then 0'
+        assert isinstance(equity_step, int), 'equity_step must be of type <int>'
+        assert equity_step >= 0, 'equity_step can\'t be less than 0'
+
+        if isinstance(chunks, str):
+            chunks = pd.read_csv(chunks, chunksize=chunk_size)
+        stream: utils.StreamingBacktest | None = None
+        warmup_frame: pd.DataFrame | None = None
+        equity_parts: List[np.ndarray] = []
+        candles: int = 0
+        peak: float = deposit
+        last_deposit: float = deposit
+        max_drawdown: float = 0.0
+        last_bar: np.ndarray | None = None
+        for chunk in chunks:
+            if warmup_frame is None:
+                frame = chunk
+            else:
+                frame = pd.concat([warmup_frame, chunk])
+            self.df = frame.reset_index(drop=True)
+            self._multi_converted_ = False
+            strategy(**strategy_kwargs)
+            if last_bar is not None:
+                self.__check_chunk_bar(last_bar, len(frame) - len(chunk) - 1, candles, closed=stream.closed)
+            if stream is None:
+                stream = utils.StreamingBacktest(deposit=deposit,
+                                                 bet=bet,
+                                                 commission=commission,
+                                                 multi_trades=self._multi_converted_)
+
+            new = slice(len(frame) - len(chunk), len(frame))
+            equity = np.fromiter(stream.run(zip(self.df['Close'].values[new],
+                                                self.df['High'].values[new],
+                                                self.df['Low'].values[new],
+                                                self.returns[new],
+                                                self.stop_losses[new],
+                                                self.take_profits[new],
+                                                self.credit_leverages[new])),
+                                 dtype=np.float64)
+            if len(equity):
+                peaks = np.fmax.accumulate(np.append(peak, equity))[1:]
+                max_drawdown = max(max_drawdown, abs(min(equity / peaks - 1)) * 100)
+                peak = peaks[-1]
+                last_deposit = equity[-1]
+            if equity_step:
+                equity_parts.append(equity[(-candles) % equity_step::equity_step])
+            candles += len(equity)
+            if stream.pass_math:
+                warn('The deal was opened out of range!')
+                break
+            if len(chunk):
+                last_bar = self.__chunk_bar(len(frame) - 1)
+            # at least one candle to compare the strategy on it
+            warmup_frame = frame.iloc[-max(warmup, 1):]
+        self._multi_converted_ = False
+
+        if stream is None:
+            stream = utils.StreamingBacktest(deposit=deposit)
+        self.trades = stream.trades
+        self.profits = stream.profits
+        self.losses = stream.losses
+        return {'deposit': last_deposit,
+                'trades': stream.trades,
+                'profits': stream.profits,
+                'losses': stream.losses,
+                'winrate': stream.profits / stream.trades * 100 if stream.trades else 0,
+                'max drawdown': max_drawdown,
+                'candles': candles,
+                'equity': np.concatenate([np.empty(0), *equity_parts]) if equity_step else None}
+
+    def backtest(self,
+                 deposit: Union[float, int] = 10_000.0,
+                 bet: Union[float, int] = np.inf,
+                 commission: Union[float, int] = 0.0,
+                 plot: bool = True,
+                 print_out: bool = True,
+                 show: bool = True,
+                 engine: str = 'loop',
+                 ledger: bool = False,
+                 metrics_only: bool = False) -> Union[pd.DataFrame, Dict[str, Any]]:
+        """
+        testing the strategy.
+        :param deposit: start deposit.
+        :param bet: fixed bet to backtest. np.inf = all deposit.
+        :param commission: percentage commission (0 -- 100).
+        :param plot: plotting.
+        :param print_out: printing.
+        :param show: show the graph
+        :param engine: 'loop' -- bar-by-bar testing, 'vectorized' -- the same test on numpy arrays,
+        'stream' -- the same test with utils.StreamingBacktest.
+        :param ledger: save closed trades to self.ledger (np.ndarray with utils.LEDGER_DTYPE).
+        :param metrics_only: do not build self.backtest_out, net returns, average growth and plots (they are None).
+        returns: pd.DataFrame with data of test (dict of utils.TUNER_CODECONF characteristics if metrics_only)
+        """
+        assert isinstance(deposit, (float, int)), 'deposit must be of type <int> or <float>'
+        assert deposit > 0, 'deposit can\'t be 0 or less'
+        assert isinstance(bet, (float, int)), 'bet must be of type <int> or <float>'
+        assert bet > 0, 'bet can\'t be 0 or less'
+        assert isinstance(commission, (float, int)), 'commission must be of type <int> or <float>'
+        assert 0 <= commission < 100, 'commission cannot be >=100% or less then 0'
+        assert isinstance(plot, bool), 'plot must be of type <bool>'
+        assert isinstance(print_out, bool), 'print_out must be of type <bool>'
+        assert isinstance(show, bool), 'show must be of type <bool>'
+        assert isinstance(engine, str), 'engine must be of type <str>'
+        assert isinstance(ledger, bool), 'ledger must be of type <bool>'
+        assert isinstance(metrics_only, bool), 'metrics_only must be of type <bool>'
+
+        self.returns_update()
+        if engine == 'loop':
+            pass_math = self._backtest_loop(deposit=deposit, bet=bet, commission=commission, ledger=ledger)
+        elif engine == 'vectorized':
+            pass_math = self._backtest_vectorized(deposit=deposit, bet=bet, commission=commission, ledger=ledger)
+        elif engine == 'stream':
+            pass_math = self._backtest_stream(deposit=deposit, bet=bet, commission=commission, ledger=ledger)
+        else:
+            raise ValueError(f'incorrect engine: {engine}')
+        data_column: pd.Series = self.df['Close']
 
-        self.deposit_history_update()
+        self.deposit_history_update(additional=not metrics_only)
 
         if pass_math:
             warn('The deal was opened out of range!')
@@ -458,8 +800,12 @@ class Trader(object):
 
         if print_out:
             print(self._info)
+        if metrics_only:
+            self.backtest_out = None
+            self._multi_converted_ = False
+            return self._tuner_characteristics()
         self.backtest_out = pd.DataFrame(
-            (self.deposit_history, self.stop_losses, self.take_profits, self.returns,
+            (self.deposit_history, self.stop_losses, self.take_profits, list(self.returns),
              self.open_lot_prices, data_column, self.average_growth, self.net_returns),
             index=[
                 'deposit', 'stop loss', 'take profit',
@@ -481,6 +827,92 @@ class Trader(object):
         self._multi_converted_ = False
         return self.backtest_out
 
+    def backtest_batch(self,
+                       signals_matrix: Union[np.ndarray, List[utils.PREDICT_TYPE_LIST]],
+                       stops_matrix: np.ndarray | None = None,
+                       takes_matrix: np.ndarray | None = None,
+                       leverages_matrix: np.ndarray | None = None,
+                       deposit: Union[float, int] = 10_000.0,
+                       bet: Union[float, int] = np.inf,
+                       commission: Union[float, int] = 0.0,
+                       chunk_size: int = 16) -> Tuple[np.ndarray, pd.DataFrame]:
+        """
+        testing many strategies over self.df in one call (see utils.backtest_arrays).
+        :param signals_matrix: (strategies x bars) signals: utils.PREDICT_TYPE or their values.
+        :param stops_matrix: (strategies x bars) or (bars,) stop loss prices. None -- without stop loss.
+        :param takes_matrix: (strategies x bars) or (bars,) take profit prices. None -- without take profit.
+        :param leverages_matrix: (strategies x bars) or (bars,) credit leverages. None -- 1.
+        :param deposit: start deposit.
+        :param bet: fixed bet to backtest. np.inf = all deposit.
+        :param commission: percentage commission (0 -- 100).
+        :param chunk_size: number of strategies tested at once.
+        returns: (equity matrix, pd.DataFrame with utils.TUNER_CODECONF characteristics of every strategy)
+        """
+        assert isinstance(deposit, (float, int)), 'deposit must be of type <int> or <float>'
+        assert deposit > 0, 'deposit can\'t be 0 or less'
+        assert isinstance(bet, (float, int)), 'bet must be of type <int> or <float>'
+        assert bet > 0, 'bet can\'t be 0 or less'
+        assert isinstance(commission, (float, int)), 'commission must be of type <int> or <float>'
+        assert 0 <= commission < 100, 'commission cannot be >=100% or less then 0'
+        assert isinstance(chunk_size, int), 'chunk_size must be of type <int>'
+        assert chunk_size > 0, 'chunk_size can\'t be 0 or less'
+
+        signals: np.ndarray = np.asarray(signals_matrix)
+        if signals.dtype == object:
+            signals = utils.signals_to_array(signals.ravel()).reshape(signals.shape)
+        signals = np.atleast_2d(signals).astype(np.int8)
+        assert signals.shape[1] == len(self.df), 'signals_matrix must have one column for every candle'
+
+        if leverages_matrix is None:
+            leverages_matrix = 1.0
+        leverages: np.ndarray = np.broadcast_to(np.asarray(leverages_matrix, dtype=np.float64), signals.shape)
+        if stops_matrix is not None:
+            stops_matrix = np.broadcast_to(np.asarray(stops_matrix, dtype=np.float64), signals.shape)
+        if takes_matrix is not None:
+            takes_matrix = np.broadcast_to(np.asarray(takes_matrix, dtype=np.float64), signals.shape)
+
+        close: np.ndarray = self.df['Close'].values.astype(np.float64)
+        high: np.ndarray = self.df['High'].values.astype(np.float64)
+        low: np.ndarray = self.df['Low'].values.astype(np.float64)
+
+        equity: np.ndarray = np.empty((len(signals), max(len(self.df), 1)))
+        characteristics: List[pd.DataFrame] = []
+        for start in range(0, len(signals), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            sell: np.ndarray = signals[chunk] == utils.SELL.value
+            if stops_matrix is None:
+                stops = np.where(sell, np.inf, -np.inf)
+            else:
+                stops = stops_matrix[chunk]
+            if takes_matrix is None:
+                takes = np.where(sell, -np.inf, np.inf)
+            else:
+                takes = takes_matrix[chunk]
+            equity[chunk], trades, profits, losses, lengths = utils.backtest_arrays(signals=signals[chunk],
+                                                                                    stop_losses=stops,
+                                                                                    take_profits=takes,
+                                                                                    leverages=leverages[chunk],
+                                                                                    close=close,
+                                                                                    high=high,
+                                                                                    low=low,
+                                                                                    deposit=deposit,
+                                                                                    bet=bet,
+                                                                                    commission=commission)
+            chunk_characteristics = utils.strategy_characteristics_batch(equity_matrix=equity[chunk],
+                                                                         timeframe=self.interval,
+                                                                         profit_trades=profits,
+                                                                         trades=trades)
+            for row in np.flatnonzero(lengths < equity.shape[1]):
+                warn('The deal was opened out of range!')
+                all_characteristics = utils.strategy_characteristics(equity=equity[start + row, :lengths[row]],
+                                                                     timeframe=self.interval,
+                                                                     additional=False)
+                chunk_characteristics.iloc[row] = [all_characteristics[name] for name in utils.TUNER_CODECONF]
+            characteristics.append(chunk_characteristics)
+        if not characteristics:
+            return equity, pd.DataFrame(columns=list(utils.TUNER_CODECONF))
+        return equity, pd.concat(characteristics, ignore_index=True)
+
     def multi_backtest(self,
                        test_config: Dict[str, List[Dict[str, Dict[str, Any]]]],
                        limit: int = 1000,
@@ -490,7 +922,8 @@ class Trader(object):
                        plot: bool = True,
                        print_out: bool = True,
                        show: bool = True,
-                       _dataframes: Dict[str, pd.DataFrame] | None = None) -> pd.DataFrame:
+                       _dataframes: Dict[str, pd.DataFrame] | None = None,
+                       metrics_only: bool = False) -> Union[pd.DataFrame, Dict[str, Any]]:
         for el in test_config.keys():
             assert isinstance(el, str), 'tickers must be of type <Iterable[str]>'
             assert fullmatch(utils.TICKER_PATTERN, el), f'all tickers must match the pattern <{utils.TICKER_PATTERN}>'
@@ -510,6 +943,7 @@ class Trader(object):
         assert isinstance(plot, bool), 'plot must be of type <bool>'
         assert isinstance(print_out, bool), 'print_out must be of type <bool>'
         assert isinstance(show, bool), 'show must be of type <bool>'
+        assert isinstance(metrics_only, bool), 'metrics_only must be of type <bool>'
 
         winrates: List[float] = []
         losses: List[int] = []
@@ -527,6 +961,7 @@ class Trader(object):
                     else:
                         df = _dataframes[ticker]
                     new_trader = self._get_this_instance(interval=self.interval, df=df, ticker=ticker)
+                    new_trader.set_dtype(self.dtype)
                     new_trader.set_client(client=self.client)
                     try:
                         new_trader.connect_graph(deepcopy(self.fig))
@@ -540,7 +975,8 @@ class Trader(object):
                                         commission=commission,
                                         plot=False,
                                         print_out=False,
-                                        show=False)
+                                        show=False,
+                                        metrics_only=True)
                     winrates.append(new_trader.winrate)
                     losses.append(new_trader.losses)
                     trades.append(new_trader.trades)
@@ -561,7 +997,12 @@ class Trader(object):
         multipliers: pd.Series = sum(depos) / len(depos)
         multipliers[0] = deposit
         self.deposit_history = list(np.cumprod(multipliers.values))
-        self.deposit_history_update()
+        self.deposit_history_update(additional=not metrics_only)
+        if metrics_only:
+            self.backtest_out = None
+            if print_out:
+                print(self._info)
+            return self._tuner_characteristics()
         self.backtest_out = pd.DataFrame(
             (self.deposit_history, self.average_growth, self.net_returns),
             index=[
@@ -660,12 +1101,11 @@ class Trader(object):
         """
 
         if mode == 'minimalist':
-            self.returns = []
-            for ret1, ret2 in zip(first_returns, second_returns):
-                if ret1 == ret2:
-                    self.returns.append(ret1)
-                else:
-                    self.returns.append(utils.EXIT)
+            first = utils.signals_to_array(first_returns)
+            second = utils.signals_to_array(second_returns)
+            length: int = min(len(first), len(second))
+            first, second = first[:length], second[:length]
+            self.returns = utils.SignalArray(np.where(first == second, first, utils.EXIT.value))
         elif mode == 'maximalist':
             self.returns = self._maximalist(first_returns, second_returns)
         elif mode == 'super':
@@ -690,20 +1130,13 @@ class Trader(object):
     @staticmethod
     def _collide_super(l1: utils.PREDICT_TYPE_LIST,
                        l2: utils.PREDICT_TYPE_LIST) -> utils.PREDICT_TYPE_LIST:
-        return_list: utils.PREDICT_TYPE_LIST = []
-        for first, sec in zip(utils.convert(l1), utils.convert(l2)):
-            if ((not np.isnan(first)) and
-                    (not np.isnan(sec))
-                    and first is not sec):
-                return_list.append(utils.EXIT)
-            elif first is sec:
-                return_list.append(first)
-            elif np.isnan(first):
-                return_list.append(sec)
-            else:
-                return_list.append(first)
-        return list(map(lambda x: utils.PREDICT_TYPE(x),
-                        utils.anti_convert(return_list)))
+        first = utils.signals_to_array(l1)
+        sec = utils.signals_to_array(l2)
+        first_new = utils.SignalArray(first).changes()
+        sec_new = utils.SignalArray(sec).changes()
+        return_list = np.where(first_new, first, sec)
+        return_list[first_new & sec_new & (first != sec)] = utils.EXIT.value
+        return utils.SignalArray(return_list[utils.forward_fill_index(first_new | sec_new)])
 
     def multi_strategy_collider(self,
                                 *strategies,
@@ -741,7 +1174,7 @@ class Trader(object):
         if self._entry_start_trade:
             open_new_order = predict != self._prev_predict or not np.isnan(conv_cred_lev[-1])
         else:
-            open_new_order = (not np.isnan(self._converted[-1])) or (not np.isnan(conv_cred_lev[-1]))
+            open_new_order = (not utils.is_nan(self._converted[-1])) or (not np.isnan(conv_cred_lev[-1]))
 
         if open_new_order:
             if self.client.trading:
@@ -777,6 +1210,12 @@ class Trader(object):
             'credit leverage': self.credit_leverages[-1]
         }
 
+    def _closed_candle(self) -> pd.Series:
+        # the last candle of self.df was not closed when it was fetched, its final prices are fetched again
+        candles = self.client.get_data_historical(ticker=self.ticker, limit=2, interval=self.interval)
+        closed = candles[candles['time'] == self.df['time'].values[-1]]
+        return (closed if len(closed) else self.df).iloc[-1]
+
     def realtime_trading(self,
                          strategy,
                          start_time: datetime,
@@ -801,6 +1240,11 @@ class Trader(object):
         :param bet_for_trading_on_client: trading bet, standard: all deposit
         :param strategy_kwargs: named arguments to -strategy.
         :param strategy_args: arguments to -strategy.
+
+        If Trader.stream is utils.StreamingBacktest, every closed candle is tested with it (paper trading),
+        its final prices are fetched when it is closed.
+        If Trader.metrics is utils.OnlineMetrics too, it is updated with the paper deposit.
+        If Trader.price_poller is brokers.PricePoller, stop loss and take profit are checked with its prices.
         """
         assert fullmatch(utils.TICKER_PATTERN, ticker), f'ticker must match the pattern <{utils.TICKER_PATTERN}>'
         assert isinstance(print_out, bool), 'print_out must be of type <bool>'
@@ -833,8 +1277,11 @@ class Trader(object):
             while True:
                 if self.client.ordered and time() + wait_sl_tp_checking <= open_time + self._sec_interval:
                     sleep(wait_sl_tp_checking)
+                    if self.price_poller is not None:
+                        price = self.price_poller.get_price(ticker)
                     with utils.locker:
-                        price = self.client.get_ticker_price(ticker)
+                        if self.price_poller is None:
+                            price = self.client.get_ticker_price(ticker)
                         min_ = min(self.__last_stop_loss, self.__last_take_profit)
                         max_ = max(self.__last_stop_loss, self.__last_take_profit)
                         if (not (min_ < price < max_)) and prediction["predict"] != 'Exit':
@@ -845,6 +1292,22 @@ class Trader(object):
                                 self.client.exit_last_order()
                 if time() >= (open_time + self._sec_interval):
                     self._prev_predict = utils.convert_signal_str(self.returns[-1])
+                    if self.stream is not None:
+                        candle = self._closed_candle()
+                        paper_deposit = self.stream.update(close=candle['Close'],
+                                                           high=candle['High'],
+                                                           low=candle['Low'],
+                                                           signal=self.returns[-1],
+                                                           stop_loss=self.stop_losses[-1],
+                                                           take_profit=self.take_profits[-1],
+                                                           credit_leverage=self.credit_leverages[-1])
+                        if print_out:
+                            print(f'{self.ticker}, {ctime()} paper deposit: {paper_deposit}')
+                        if self.metrics is not None:
+                            self.metrics.update(paper_deposit)
+                            if print_out:
+                                print(f'{self.ticker}, {ctime()} Sharpe ratio: {self.metrics.sharpe_ratio}, '
+                                      f'max drawdown: {self.metrics.max_drawdown}')
                     open_time += self._sec_interval
                     break
                 elif strategy_in_sleep:
@@ -859,10 +1322,13 @@ class Trader(object):
                                limit: int = 1000,
                                strategy_in_sleep: bool = False,
                                deposit_part: Union[float, int] = 1.0,  # for all trades,
-                               entry_start_trade: bool = False):
+                               entry_start_trade: bool = False,
+                               shared_prices: bool = False):
         """
 
         :param trade_config: Configurations to start trading. {ticker: [{strategy: {parameter: value}}]}
+        :param shared_prices: check stop losses and take profits of all pairs with one brokers.PricePoller
+        (one fetch_tickers request every wait_sl_tp_checking seconds), if the exchange has fetchTickers.
         """
         tickers: List[str] = list(trade_config.keys())
         for el in tickers:
@@ -885,10 +1351,16 @@ class Trader(object):
                     assert strat_name in self.__dir__(), 'There is no such strategy'
         assert isinstance(deposit_part, (int, float)), 'deposit_part must be of type <int> or <float>'
         assert 1 >= deposit_part > 0, 'deposit_part cannot be greater than 1 or less than 0(inclusively)'
+        assert isinstance(shared_prices, bool), 'shared_prices must be of type <bool>'
 
         can_orders: int = sum([len(x) for x in trade_config.values()])
         bet_for_trading_on_client_copy: Union[float, int] = bet_for_trading_on_client
         client = self.client
+        price_poller: PricePoller | None = None
+        if shared_prices and getattr(client.client, 'has', {}).get('fetchTickers'):
+            price_poller = PricePoller(client=client, interval=wait_sl_tp_checking)
+            price_poller.watch(*tickers)
+            price_poller.start()
 
         class MultiRealTimeTrader(self.__class__):
             def get_trading_predict(self,
@@ -911,8 +1383,10 @@ class Trader(object):
         def start_trading(pair, strat):
             trader = MultiRealTimeTrader(ticker=pair,
                                          interval=self.interval)
+            trader.set_dtype(self.dtype)
             trader.connect_graph(graph=deepcopy(self.fig))
             trader.set_client(deepcopy(client))
+            trader.price_poller = price_poller
 
             items = tuple(strat.items())
             item = items[0]
@@ -984,36 +1458,21 @@ class Trader(object):
         self.returns_update()
         self._take_profit = take_profit
         self._stop_loss = stop_loss
-        take_flag: float = np.inf
-        stop_flag: float = np.inf
-        self.open_lot_prices = []
-        if set_stop:
-            self.stop_losses = []
-        if set_take:
-            self.take_profits = []
-        closes: np.ndarray = self.df['Close'].values
-        sig: utils.PREDICT_TYPE
-        close: float
-        converted: utils.CONVERTED_TYPE
-        ts: Dict[str, float]
-        for e, (sig, close, converted) in enumerate(zip(self.returns, closes, self._converted)):
-            if converted is not np.nan:
-                self._open_price = close
-                if sig != utils.EXIT:
-                    if set_take or set_stop:
-                        ts = self.__get_stop_take(sig)
-                    if set_take:
-                        take_flag = ts['take']
-                    if set_stop:
-                        stop_flag = ts['stop']
-                else:
-                    take_flag = stop_flag = self._open_price
-
-            self.open_lot_prices.append(self._open_price)
-            if set_take:
-                self.take_profits.append(take_flag)
+        signals: np.ndarray = utils.signals_to_array(self.returns)
+        closes: np.ndarray = self.df['Close'].values[:len(signals)]
+        signals = signals[:len(closes)]
+        open_prices: np.ndarray = closes[utils.forward_fill_index(utils.SignalArray(signals).changes())]
+        if len(open_prices):
+            self._open_price = open_prices[-1]
+        self.open_lot_prices = open_prices.tolist()
+        if set_stop or set_take:
+            ts: Dict[str, np.ndarray] = self.__get_stop_take(signals, open_prices)
             if set_stop:
-                self.stop_losses.append(stop_flag)
+                self.stop_losses = ts['stop'].tolist()
+            if set_take:
+                self.take_profits = ts['take'].tolist()
+        if not self._strategy_depth:
+            self._apply_dtype('stop_losses', 'take_profits', 'open_lot_prices')
 
     def set_credit_leverages(self, credit_lev: Union[float, int] = 1.0):
         """
@@ -1051,71 +1510,86 @@ class Trader(object):
     def correct_sl_tp(self,
                       sl_correction: Union[float, int] = 50,
                       tp_correction: Union[float, int] = 50):
-        stop_losses_before = self.stop_losses
-        take_profits_before = self.take_profits
-        for e, (sl, tp, p, sig, conv) in enumerate(zip(stop_losses_before, take_profits_before, self.df['Close'], self.returns, self._converted)):
-            if sig == utils.SELL:
-                if conv is not np.nan:
-                    correct_sl = p * (1 + sl_correction / 10_000)
-                    correct_tp = p * (1 - tp_correction / 10_000)
-                    correct_sl_use = False
-                    correct_tp_use = False
-
-                if p < sl:
-                    correct_sl_use = True
-                if p > tp:
-                    correct_tp_use = True
-
-                if correct_sl_use:
-                    self.stop_losses[e] = sl
-                else:
-                    self.stop_losses[e] = correct_sl
-            elif sig == utils.BUY:
-                if conv is not np.nan:
-                    correct_sl = p * (1 - sl_correction / 10_000)
-                    correct_tp = p * (1 + tp_correction / 10_000)
-                    correct_sl_use = False
-                    correct_tp_use = False
-
-                if p > sl:
-                    correct_sl_use = True
-                if p < tp:
-                    correct_tp_use = True
-
-                if correct_sl_use:
-                    self.stop_losses[e] = sl
-                else:
-                    self.stop_losses[e] = correct_sl
-
-    def trailing_stop(self):
-        for (i,
-             (price,
-              high,
-              low,
-              entry,
-              signal,
-              sl_before,
-              open_trade)
-             ) in enumerate(zip(self.df['Close'],
-                                self.df['High'].values,
-                                self.df['Low'].values,
-                                self._converted,
-                                self.returns,
-                                self.stop_losses,
-                                self.open_lot_prices)):
-            if entry is not np.nan:
-                diff_open_sl = sl_before - open_trade
-                trade_high = high
-                trade_low = low
-            trade_low = min(low, trade_low)
-            trade_high = max(high, trade_high)
-            if signal == utils.BUY:
-                sl = trade_high + diff_open_sl
-            elif signal == utils.SELL:
-                sl = trade_low + diff_open_sl
+        length: int = min(len(self.stop_losses),
+                          len(self.take_profits),
+                          len(self.df),
+                          len(self.returns),
+                          len(self._converted))
+        if isinstance(self.returns, utils.SignalArray):
+            sides: np.ndarray = self.returns.values[:length].astype(np.float64)
+        else:
+            sides = np.array([getattr(signal, 'value', signal) for signal in self.returns[:length]], dtype=np.float64)
+        closes: np.ndarray = self.df['Close'].values[:length].astype(np.float64)
+        stop_losses: np.ndarray = np.array(self.stop_losses[:length], dtype=np.float64)
+        in_trade: np.ndarray = (sides == utils.BUY.value) | (sides == utils.SELL.value)
+
+        # the correct stop loss is set by the last new signal of a trade
+        entries: np.ndarray = in_trade & utils.converted_mask(self._converted[:length])
+        entry: np.ndarray = utils.forward_fill_index(entries)
+        with np.errstate(invalid='ignore'):
+            correct_sl: np.ndarray = closes[entry] * (1 - sides[entry] * sl_correction / 10_000)
+        # once the price has passed the stop loss, the stop losses of this trade are kept
+        passed: np.ndarray = in_trade & np.where(sides == utils.BUY.value, closes > stop_losses, closes < stop_losses)
+        passed_count: np.ndarray = np.cumsum(passed)
+        keep_sl: np.ndarray = passed_count > passed_count[entry] - passed[entry]
+        update: np.ndarray = in_trade & entries[entry]
+        stop_losses[update] = np.where(keep_sl, stop_losses, correct_sl)[update]
+
+        if isinstance(self.stop_losses, np.ndarray):
+            self.stop_losses[:length] = stop_losses
+        else:
+            self.stop_losses[:length] = stop_losses.tolist()
+
+    def trailing_stop(self,
+                      percent: Union[float, int, None] = None,
+                      atr_window: Union[int, None] = None,
+                      atr_multiplier: Union[float, int] = 1.0):
+        """
+        Moves stop losses behind the highest (for BUY) or the lowest (for SELL) price of the trade.
+        By default, the distance between the price and the stop loss is the same as when the trade was opened.
+        :param percent: distance in percents of the highest/lowest price.
+        :param atr_window: use the average true range of this window (multiplied by atr_multiplier) as the distance.
+        :param atr_multiplier: multiplier of the average true range.
+        """
+        assert percent is None or atr_window is None, 'use only one of percent and atr_window'
+        assert percent is None or isinstance(percent, (float, int)), 'percent must be of type <float> or <int>'
+        assert atr_window is None or isinstance(atr_window, int), 'atr_window must be of type <int>'
+        assert isinstance(atr_multiplier, (float, int)), 'atr_multiplier must be of type <float> or <int>'
+
+        signals: np.ndarray = utils.signals_to_array(self.returns)
+        length: int = min(len(signals), len(self.df), len(self.stop_losses), len(self.open_lot_prices))
+        signals = signals[:length]
+        stop_losses: np.ndarray = np.array(self.stop_losses[:length], dtype=float)
+        highs: pd.Series = pd.Series(self.df['High'].values[:length])
+        lows: pd.Series = pd.Series(self.df['Low'].values[:length])
+
+        entries: np.ndarray = utils.SignalArray(signals).changes()
+        trade_ids: np.ndarray = np.cumsum(entries)
+        if atr_window is None:
+            trade_high: np.ndarray = highs.groupby(trade_ids).cummax().values
+            trade_low: np.ndarray = lows.groupby(trade_ids).cummin().values
+            if percent is None:
+                diff_open_sl = (stop_losses - np.array(self.open_lot_prices[:length], dtype=float))
+                diff_open_sl = diff_open_sl[utils.forward_fill_index(entries)]
+                buy_sl = trade_high + diff_open_sl
+                sell_sl = trade_low + diff_open_sl
             else:
-                sl = sl_before
-            self.stop_losses[i] = sl
+                buy_sl = trade_high * (1 - percent / 100)
+                sell_sl = trade_low * (1 + percent / 100)
+        else:
+            atr: np.ndarray = indicators.cached(ta.volatility.average_true_range,
+                                                highs,
+                                                lows,
+                                                pd.Series(self.df['Close'].values[:length]),
+                                                window=atr_window).values * atr_multiplier
+            buy_sl = (highs - atr).groupby(trade_ids).cummax().values
+            sell_sl = (lows + atr).groupby(trade_ids).cummin().values
+
+        self.stop_losses[:length] = np.select([signals == utils.BUY.value, signals == utils.SELL.value],
+                                              [buy_sl, sell_sl],
+                                              stop_losses).tolist()
+        if not self._strategy_depth:
+            self._apply_dtype('stop_losses')
 
     def profit_distribution(self, steps: int = 100) -> pd.Series:
         equity = np.array(self.deposit_history)
@@ -1251,17 +1725,22 @@ class ExampleStrategies(Trader):
                           chinkouspan: int = 26,
                           stop_loss_plus: Union[float, int] = 40.0,  # sl_tp_adder
                           plot: bool = True) -> utils.PREDICT_TYPE_LIST:
-        cloud = ta.trend.IchimokuIndicator(self.df["High"],
-                                           self.df["Low"],
-                                           tenkansen,
-                                           kijunsen,
-                                           senkouspan,
-                                           visual=True,
-                                           fillna=True)
-        tenkan_sen: np.ndarray = cloud.ichimoku_conversion_line().values
-        kinjun_sen: np.ndarray = cloud.ichimoku_base_line().values
-        senkou_span_a: np.ndarray = cloud.ichimoku_a().values
-        senkou_span_b: np.ndarray = cloud.ichimoku_b().values
+        cloud: pd.DataFrame = indicators.cached(ta.trend.IchimokuIndicator,
+                                                self.df["High"],
+                                                self.df["Low"],
+                                                outputs=('ichimoku_conversion_line',
+                                                         'ichimoku_base_line',
+                                                         'ichimoku_a',
+                                                         'ichimoku_b'),
+                                                window1=tenkansen,
+                                                window2=kijunsen,
+                                                window3=senkouspan,
+                                                visual=True,
+                                                fillna=True)
+        tenkan_sen: np.ndarray = cloud['ichimoku_conversion_line'].values
+        kinjun_sen: np.ndarray = cloud['ichimoku_base_line'].values
+        senkou_span_a: np.ndarray = cloud['ichimoku_a'].values
+        senkou_span_b: np.ndarray = cloud['ichimoku_b'].values
         prices: pd.Series = self.df['Close']
         chinkou_span: np.ndarray = prices.shift(-chinkouspan).values
         flag1: utils.PREDICT_TYPE = utils.EXIT
@@ -1354,7 +1833,7 @@ class ExampleStrategies(Trader):
 
     @strategy
     def strategy_buy_hold(self) -> utils.PREDICT_TYPE_LIST:
-        self.returns = [utils.BUY for _ in range(len(self.df))]
+        self.returns = utils.SignalArray(np.full(len(self.df), utils.BUY.value))
         self.set_credit_leverages()
         self.set_open_stop_and_take()
         return self.returns
@@ -1365,8 +1844,8 @@ class ExampleStrategies(Trader):
                        fast: int = 30,
                        plot: bool = True) -> utils.PREDICT_TYPE_LIST:
         self.returns = []
-        SMA1 = ta.trend.sma_indicator(self.df['Close'], fast)
-        SMA2 = ta.trend.sma_indicator(self.df['Close'], slow)
+        SMA1 = indicators.cached(ta.trend.sma_indicator, self.df['Close'], window=fast)
+        SMA2 = indicators.cached(ta.trend.sma_indicator, self.df['Close'], window=slow)
         if plot:
             self.fig.plot_line(line=SMA1.values,
                                width=utils.MA_FAST_WIDTH,
@@ -1402,9 +1881,9 @@ class ExampleStrategies(Trader):
                        fast: int = 13,
                        plot: bool = True) -> utils.PREDICT_TYPE_LIST:
         self.returns = []
-        SMA1 = ta.trend.sma_indicator(self.df['Close'], fast)
-        SMA2 = ta.trend.sma_indicator(self.df['Close'], mid)
-        SMA3 = ta.trend.sma_indicator(self.df['Close'], slow)
+        SMA1 = indicators.cached(ta.trend.sma_indicator, self.df['Close'], window=fast)
+        SMA2 = indicators.cached(ta.trend.sma_indicator, self.df['Close'], window=mid)
+        SMA3 = indicators.cached(ta.trend.sma_indicator, self.df['Close'], window=slow)
 
         if plot:
             for SMA, color, speed, name, alpha, size in zip([SMA1, SMA2, SMA3],
@@ -1440,9 +1919,9 @@ class ExampleStrategies(Trader):
                        fast: int = 3,
                        plot: bool = True) -> utils.PREDICT_TYPE_LIST:
         self.returns = []
-        ema3 = ta.trend.ema_indicator(self.df['Close'], fast)
-        ema21 = ta.trend.ema_indicator(self.df['Close'], mid)
-        ema46 = ta.trend.ema_indicator(self.df['Close'], slow)
+        ema3 = indicators.cached(ta.trend.ema_indicator, self.df['Close'], window=fast)
+        ema21 = indicators.cached(ta.trend.ema_indicator, self.df['Close'], window=mid)
+        ema46 = indicators.cached(ta.trend.ema_indicator, self.df['Close'], window=slow)
 
         if plot:
             for SMA, color, speed, name, alpha, size in zip([ema3.values, ema21.values, ema46.values],
@@ -1474,7 +1953,7 @@ class ExampleStrategies(Trader):
     def strategy_macd(self,
                       slow: int = 100,
                       fast: int = 30) -> utils.PREDICT_TYPE_LIST:
-        diff = ta.trend.macd_diff(self.df['Close'], slow, fast)
+        diff = indicators.cached(ta.trend.macd_diff, self.df['Close'], window_slow=slow, window_fast=fast)
 
         for j in diff:
             if j > 0:
@@ -1495,7 +1974,7 @@ class ExampleStrategies(Trader):
                      min_mid: Union[float, int] = 87,
                      **rsi_kwargs) -> utils.PREDICT_TYPE_LIST:
         self.returns = []
-        rsi = ta.momentum.rsi(close=self.df['Close'], **rsi_kwargs)
+        rsi = indicators.cached(ta.momentum.rsi, self.df['Close'], **rsi_kwargs)
         flag: utils.PREDICT_TYPE = utils.EXIT
 
         for val in rsi.values:
@@ -1516,11 +1995,15 @@ class ExampleStrategies(Trader):
     @strategy
     def strategy_parabolic_SAR(self, plot: bool = True, **sar_kwargs) -> utils.PREDICT_TYPE_LIST:
         self.returns = []
-        sar: ta.trend.PSARIndicator = ta.trend.PSARIndicator(self.df['High'], self.df['Low'],
-                                                             self.df['Close'], **sar_kwargs)
-        sardown: np.ndarray = sar.psar_down().values
-        sarup: np.ndarray = sar.psar_up().values
-        self.stop_losses = sar.psar().values.tolist()
+        sar: pd.DataFrame = indicators.cached(ta.trend.PSARIndicator,
+                                              self.df['High'],
+                                              self.df['Low'],
+                                              self.df['Close'],
+                                              outputs=('psar', 'psar_up', 'psar_down'),
+                                              **sar_kwargs)
+        sardown: np.ndarray = sar['psar_down'].values
+        sarup: np.ndarray = sar['psar_up'].values
+        self.stop_losses = sar['psar'].values.tolist()
         if plot:
             self.fig.plot_line(line=sarup,
                                width=utils.SAR_UP_WIDTH,
@@ -1558,9 +2041,14 @@ class ExampleStrategies(Trader):
                                      slow: int = 23,
                                      fast: int = 12,
                                      **macd_kwargs) -> utils.PREDICT_TYPE_LIST:
-        _MACD_ = ta.trend.MACD(self.df['Close'], slow, fast, **macd_kwargs)
-        signal_ = _MACD_.macd_signal()
-        macd_ = _MACD_.macd()
+        _MACD_: pd.DataFrame = indicators.cached(ta.trend.MACD,
+                                                 self.df['Close'],
+                                                 outputs=('macd', 'macd_signal'),
+                                                 window_slow=slow,
+                                                 window_fast=fast,
+                                                 **macd_kwargs)
+        signal_ = _MACD_['macd_signal']
+        macd_ = _MACD_['macd']
         histogram: pd.DataFrame = pd.DataFrame(macd_.values - signal_.values)
         for element in histogram.diff().values:
             if element == 0:
@@ -1607,6 +2095,14 @@ class ExampleStrategies(Trader):
         self.set_credit_leverages()
         return self.returns
 
+    def _bollinger_bands(self, *bollinger_args, **bollinger_kwargs) -> pd.DataFrame:
+        return indicators.cached(ta.volatility.BollingerBands,
+                                 self.df['Close'],
+                                 outputs=('bollinger_mavg', 'bollinger_hband', 'bollinger_lband'),
+                                 fillna=True,
+                                 **dict(zip(['window', 'window_dev'], bollinger_args)),
+                                 **bollinger_kwargs)
+
     @strategy
     def strategy_bollinger(self,
                            plot: bool = True,
@@ -1615,14 +2111,11 @@ class ExampleStrategies(Trader):
                            **bollinger_kwargs) -> utils.PREDICT_TYPE_LIST:
         self.returns = []
         flag: utils.PREDICT_TYPE = utils.EXIT
-        bollinger: ta.volatility.BollingerBands = ta.volatility.BollingerBands(self.df['Close'],
-                                                                               fillna=True,
-                                                                               *bollinger_args,
-                                                                               **bollinger_kwargs)
-
-        mid_: pd.Series = bollinger.bollinger_mavg()
-        upper: pd.Series = bollinger.bollinger_hband()
-        lower: pd.Series = bollinger.bollinger_lband()
+        bollinger: pd.DataFrame = self._bollinger_bands(*bollinger_args, **bollinger_kwargs)
+
+        mid_: pd.Series = bollinger['bollinger_mavg']
+        upper: pd.Series = bollinger['bollinger_hband']
+        lower: pd.Series = bollinger['bollinger_lband']
         if plot:
             self.fig.plot_line(line=upper.values,
                                width=utils.UPPER_BB_WIDTH,
@@ -1678,14 +2171,10 @@ class ExampleStrategies(Trader):
                                 **bollinger_kwargs)
         self.inverse_strategy()
         if to_opposite:
-            bollinger: ta.volatility.BollingerBands = ta.volatility.BollingerBands(self.df['Close'],
-                                                                                   fillna=True,
-                                                                                   *bollinger_args,
-                                                                                   **bollinger_kwargs)
-
-            mid_: pd.Series = bollinger.bollinger_mavg()
-            upper: pd.Series = bollinger.bollinger_hband()
-            lower: pd.Series = bollinger.bollinger_lband()
+            bollinger: pd.DataFrame = self._bollinger_bands(*bollinger_args, **bollinger_kwargs)
+
+            upper: pd.Series = bollinger['bollinger_hband']
+            lower: pd.Series = bollinger['bollinger_lband']
             self.stop_losses = []
             for sig, high, low in zip(self.returns,
                                       upper,
@@ -1723,13 +2212,15 @@ class ExampleStrategies(Trader):
                     sl: float = 300.0,
                     tp: float = 500.0):
         self.returns = []
-        stoch = ta.momentum.StochRSIIndicator(close=(self.df['High'] + self.df['Low']) / 2,
-                                              window=length,
-                                              smooth1=s1,
-                                              smooth2=s2)
+        stoch = indicators.cached(ta.momentum.StochRSIIndicator,
+                                  (self.df['High'] + self.df['Low']) / 2,
+                                  outputs=('stochrsi_k', 'stochrsi_d'),
+                                  window=length,
+                                  smooth1=s1,
+                                  smooth2=s2)
         flag = utils.EXIT
-        for fast, slow in zip(stoch.stochrsi_k() * 100,
-                              stoch.stochrsi_d() * 100):
+        for fast, slow in zip(stoch['stochrsi_k'] * 100,
+                              stoch['stochrsi_d'] * 100):
             if fast > 80 and slow > 80:
                 flag = utils.SELL
             if fast < 20 and slow < 20:
@@ -1748,19 +2239,20 @@ class ExampleStrategies(Trader):
                       sl: float = 300.0,
                       tp: float = 500.0):
         self.returns = []
-        stoch = ta.momentum.StochasticOscillator(close=self.df['Close'],
-                                                 high=self.df['High'],
-                                                 low=self.df['Low'],
-                                                 window=STOCH_length,
-                                                 smooth_window=STOCH_smooth)
+        stoch = indicators.cached(ta.momentum.StochasticOscillator,
+                                  self.df['High'],
+                                  self.df['Low'],
+                                  self.df['Close'],
+                                  outputs=('stoch', 'stoch_signal'),
+                                  window=STOCH_length,
+                                  smooth_window=STOCH_smooth)
 
-        rsi = ta.momentum.RSIIndicator(close=self.df['Close'],
-                                       window=RSI_length)
+        rsi = indicators.cached(ta.momentum.rsi, self.df['Close'], window=RSI_length)
 
         flag = utils.EXIT
-        for a, b, c in zip(stoch.stoch(),
-                           stoch.stoch_signal(),
-                           rsi.rsi()):
+        for a, b, c in zip(stoch['stoch'],
+                           stoch['stoch_signal'],
+                           rsi):
             if min(a, b) > 80 and c > 80:
                 flag = utils.SELL
             if max(a, b) < 20 and c < 20:
@@ -1773,9 +2265,9 @@ class ExampleStrategies(Trader):
 
     @strategy
     def strategy_kst(self, sl=5000, **kst_kwargs):
-        KST = ta.trend.KSTIndicator(close=self.df['Close'], **kst_kwargs)
-        fast = KST.kst()
-        slow = KST.kst_sig()
+        KST = indicators.cached(ta.trend.KSTIndicator, self.df['Close'], outputs=('kst', 'kst_sig'), **kst_kwargs)
+        fast = KST['kst']
+        slow = KST['kst_sig']
         self.returns = []
         for e, s in zip(fast, slow):
             if e > s:
@@ -1789,12 +2281,9 @@ class ExampleStrategies(Trader):
     @strategy
     def strategy_cci(self, **cci_kwargs):
         self.returns = []
-        CCI = ta.trend.CCIIndicator(self.df['High'],
-                                    self.df['Low'],
-                                    self.df['Close'],
-                                    **cci_kwargs)
-        RSI = ta.momentum.RSIIndicator(self.df['Close'])
-        for price, cci, rsi in zip(self.df['Close'].values, CCI.cci(), RSI.rsi()):
+        CCI = indicators.cached(ta.trend.cci, self.df['High'], self.df['Low'], self.df['Close'], **cci_kwargs)
+        RSI = indicators.cached(ta.momentum.rsi, self.df['Close'])
+        for price, cci, rsi in zip(self.df['Close'].values, CCI, RSI):
             if cci < 10 and rsi < 43:
                 self.returns.append(utils.BUY)
         self.set_credit_leverages()
@@ -1805,21 +2294,22 @@ class ExampleStrategies(Trader):
         self.stop_losses = []
         self.returns = []
 
-        macd_indicator = ta.trend.MACD(close=self.df['Close'],
-                                       window_slow=slow,
-                                       window_fast=fast,
-                                       fillna=True)
-        histogram = macd_indicator.macd_diff()
+        histogram = indicators.cached(ta.trend.macd_diff,
+                                      self.df['Close'],
+                                      window_slow=slow,
+                                      window_fast=fast,
+                                      fillna=True)
 
-        atr = ta.volatility.AverageTrueRange(high=self.df['High'],
-                                             low=self.df['Low'],
-                                             close=self.df['Close'],
-                                             window=ATR_win,
-                                             fillna=True)
+        atr = indicators.cached(ta.volatility.average_true_range,
+                                self.df['High'],
+                                self.df['Low'],
+                                self.df['Close'],
+                                window=ATR_win,
+                                fillna=True)
 
         for diff, price, stop_indicator in zip(histogram.values,
                                                self.df['Close'].values,
-                                               atr.average_true_range().values):
+                                               atr.values):
             stop_indicator *= ATR_multiplier
 
             if diff > 0:
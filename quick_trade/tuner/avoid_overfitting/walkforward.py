@@ -60,6 +60,7 @@ class WalkForward:
     max_drawdown: float
     profit_deviation_ratio: float
     average_growth: np.ndarray
+    metrics: utils.OnlineMetrics
 
     def __load_df(self, ticker, timeframe):
         self._df = self._client.get_data_historical(ticker=ticker,
@@ -137,6 +138,7 @@ class WalkForward:
         self.__prepare_df()
 
         self.total_equity = []
+        self.metrics = utils.OnlineMetrics(timeframe=self.timeframe)
 
         samples = zip(*self._make_samples())
         if use_tqdm:
@@ -167,10 +169,11 @@ class WalkForward:
 
             oos_equity = OOS.equity()[self._indent_chunks*self.chunk_length:]
             multipliers = utils.get_multipliers(pd.Series(oos_equity))
-            self.total_equity.extend(multipliers)
+            stitched = np.cumprod(multipliers) * (self.total_equity[-1] if self.total_equity else 1)
+            self.total_equity.extend(stitched)
+            self.metrics.extend(stitched)
             if use_tqdm:
                 bar.update(1)
-        self.total_equity = list(np.cumprod(self.total_equity))
         self._update_info()
 
     def actual_config(self,
@@ -201,8 +204,11 @@ class WalkForward:
         return self.total_equity
 
     def _update_info(self):
-        stats = utils.strategy_characteristics(equity=self.equity(),
-                                               timeframe=self.timeframe)
+        stats = self.metrics.characteristics(equity=self.equity())
+        net_returns = pd.Series(self.equity(), dtype=np.float64).diff()
+        net_returns[0] = 0.0
+        stats['net_returns'] = net_returns
+        stats['average_growth'] = self.metrics.average_growth()
         for name, param in {**utils.TUNER_CODECONF,
                             **utils.ADDITIONAL_TRADER_ATTRIBUTES}.items():
             try:
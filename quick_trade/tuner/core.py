@@ -36,6 +36,18 @@ def transform_all_tunable_values(strategies_kwargs: Dict[str, List[Dict[str, Any
                     return transform_all_tunable_values(strategies_kwargs)
     return strategies_kwargs
 
+def tunes_from_journal(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    :param records: records of the tune journal: {'ticker', 'interval', 'limit', 'strategy', 'characteristics'}
+    :return: {ticker: {interval: {limit: {strategy: characteristics}}}} like the saved JSON (limits are strings)
+    """
+    tunes: Dict[str, Any] = {}
+    for record in records:
+        tunes.setdefault(record['ticker'], {}) \
+            .setdefault(record['interval'], {}) \
+            .setdefault(str(record['limit']), {})[record['strategy']] = record['characteristics']
+    return tunes
+
 def resort_tunes(tunes: dict, sort_by: str = 'percentage year profit', drop_na: bool = True):
     if drop_na:
         for key, data in tunes.copy().items():
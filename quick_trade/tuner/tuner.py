@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+import os
+from itertools import chain
 from itertools import product
 from typing import Any
 from typing import Dict
 from typing import Iterable
+from typing import Iterator
 from typing import List
 from typing import Tuple
 
@@ -13,10 +18,11 @@ from pandas import DataFrame
 from tqdm import tqdm
 
 from .core import TunableValue
-from .core import transform_all_tunable_values, resort_tunes
+from .core import transform_all_tunable_values, resort_tunes, tunes_from_journal
 from .. import utils
 from ..brokers import TradingClient
 from .. import _saving
+from .._shared_memory import SharedFrame
 from .._code_inspect import format_arguments
 
 
@@ -76,62 +82,66 @@ class QuickTradeTuner(object):
             use_tqdm: bool = True,
             update_json: bool = True,
             update_json_path: str = 'returns.json',
+            n_jobs: int = 1,
+            resume: bool = False,
             **backtest_kwargs
     ) -> dict:
+        """
+        :param n_jobs: number of processes. With n_jobs > 1 combinations are tested by a process pool:
+        trading_class must be importable (defined at module level), the frames are fetched in this process
+        and placed in shared memory once, workers use zero-copy views.
+        :param resume: skip the combinations, which are in the journal of the previous tune
+        (QuickTradeTuner.journal_path(update_json_path)) with the same candles (utils.frame_fingerprint).
+        """
+        assert isinstance(n_jobs, int) and n_jobs > 0, 'n_jobs must be of type <int> and greater than 0'
         backtest_kwargs['plot'] = False
         backtest_kwargs['show'] = False
         backtest_kwargs['print_out'] = False
+        backtest_kwargs['metrics_only'] = True
         if use_tqdm:
             bar: tqdm = tqdm(
                 total=len(self._strategies) * len(self._frames_data)
             )
 
         self.result_tunes = utils.recursive_dict()
-        for data in self._frames_data:
+        journal = _saving.JSONLines(self.journal_path(update_json_path))
+        checkpoint: Dict[tuple, Tuple[str, Dict[str, Any]]] = {}
+        if resume:
+            journal.repair()
+            for record in journal.read():
+                key = (record['ticker'], record['interval'], record['limit'], record['strategy'], record.get('data'))
+                checkpoint[key] = (record['strategy'], record['characteristics'])
+        elif update_json:
+            journal.clear()
+        if n_jobs == 1:
+            results = self._tune_serial(trading_class=trading_class,
+                                        backtest_kwargs=backtest_kwargs,
+                                        checkpoint=checkpoint)
+        else:
+            results = self._tune_parallel(trading_class=trading_class,
+                                          backtest_kwargs=backtest_kwargs,
+                                          n_jobs=n_jobs,
+                                          checkpoint=checkpoint)
+        for data, fingerprint, resumed, (strat_kw, characteristics) in results:
             ticker = data[0]
             interval = data[1]
             limit = data[2]
-            if not self.multi_test:
-                df = self._get_df(ticker=ticker,
-                                  interval=interval,
-                                  limit=limit)
-            else:
-                df = DataFrame()
-                frames = {t: self._get_df(ticker=t, interval=interval, limit=limit) for t in ticker}
-                if '_dataframes' in backtest_kwargs:
-                    backtest_kwargs['_dataframes'] = frames
-            for strategy, kwargs in self._strategies:
-                trader = trading_class(ticker='ALL/ALL' if self.multi_test else ticker, df=df, interval=interval)
-                trader.set_client(self.client)
-
-                if self.multi_test:
-                    backtest_kwargs['limit'] = limit
-                    kwargs_m = {}
-                    for ticker_ in ticker:
-                        kwargs_m[ticker_] = [{strategy: kwargs}]
-                    trader.multi_backtest(test_config=kwargs_m,
-                                          **backtest_kwargs)
-                else:
-                    trader._get_attr(strategy)(**kwargs)
-                    trader.backtest(**backtest_kwargs)
-
-                if self.multi_test:
-                    old_tick = ticker
-                    ticker = ' '.join(self.tickers)
-                    strat_kw = format_arguments(strategy, kwargs=kwargs)
-                else:
-                    strat_kw = trader._registered_strategy
-                self.strategies_and_kwargs.append(strat_kw)
-
-                for filter_name, filter_attr in utils.TUNER_CODECONF.items():
-                    self.result_tunes[ticker][interval][limit][strat_kw][filter_name] = trader._get_attr(filter_attr)
-
-                if self.multi_test:
-                    ticker = old_tick
-                if use_tqdm:
-                    bar.update(1)
-                if update_json:
-                    self.save_tunes(path=update_json_path)
+            if self.multi_test:
+                ticker = ' '.join(self.tickers)
+            self.strategies_and_kwargs.append(strat_kw)
+
+            for filter_name, value in characteristics.items():
+                self.result_tunes[ticker][interval][limit][strat_kw][filter_name] = value
+
+            if use_tqdm:
+                bar.update(1)
+            if update_json and not resumed:
+                journal.append({'ticker': ticker,
+                                'interval': interval,
+                                'limit': limit,
+                                'strategy': strat_kw,
+                                'data': fingerprint,
+                                'characteristics': characteristics})
 
         for data in self._frames_data:
             ticker = data[0]
@@ -150,8 +160,128 @@ class QuickTradeTuner(object):
             if self.multi_test:
                 ticker = old_tick
 
+        if update_json:
+            # compact the journal, it stays as the checkpoint for resume=True
+            self.save_tunes(path=update_json_path)
         return self.result_tunes
 
+    @staticmethod
+    def journal_path(path: str = 'returns.json') -> str:
+        """
+        :return: path of the journal of the results of tune (JSON Lines, one combination per line).
+        """
+        return os.path.splitext(path)[0] + '.jsonl'
+
+    def _get_frames(self, data: tuple) -> Tuple[DataFrame, Dict[str, DataFrame]]:
+        ticker = data[0]
+        interval = data[1]
+        limit = data[2]
+        if not self.multi_test:
+            return self._get_df(ticker=ticker,
+                                interval=interval,
+                                limit=limit), {}
+        return DataFrame(), {t: self._get_df(ticker=t, interval=interval, limit=limit) for t in ticker}
+
+    @staticmethod
+    def _fingerprint(df: DataFrame, frames: Dict[str, DataFrame]) -> str:
+        if not frames:
+            return utils.frame_fingerprint(df)
+        return utils.frame_fingerprint(DataFrame({'ticker': sorted(frames),
+                                                  'data': [utils.frame_fingerprint(frames[t]) for t in sorted(frames)]}))
+
+    def _checkpoint_key(self, data: tuple, strategy: str, kwargs: Dict[str, Any], fingerprint: str) -> tuple:
+        ticker = data[0]
+        if self.multi_test:
+            ticker = ' '.join(self.tickers)
+        return ticker, data[1], data[2], format_arguments(strategy, kwargs=kwargs), fingerprint
+
+    def _tune_serial(self,
+                     trading_class,
+                     backtest_kwargs: Dict[str, Any],
+                     checkpoint: Dict[tuple, Tuple[str, Dict[str, Any]]]) -> Iterator[tuple]:
+        for data in self._frames_data:
+            df, frames = self._get_frames(data)
+            fingerprint = self._fingerprint(df, frames)
+            if self.multi_test and '_dataframes' in backtest_kwargs:
+                backtest_kwargs['_dataframes'] = frames
+            for strategy, kwargs in self._strategies:
+                key = self._checkpoint_key(data, strategy=strategy, kwargs=kwargs, fingerprint=fingerprint)
+                if key in checkpoint:
+                    yield data, fingerprint, True, checkpoint[key]
+                    continue
+                yield data, fingerprint, False, _tune_combination(trading_class=trading_class,
+                                                                  client=self.client,
+                                                                  multi_test=self.multi_test,
+                                                                  data=data,
+                                                                  df=df,
+                                                                  strategy=strategy,
+                                                                  kwargs=kwargs,
+                                                                  backtest_kwargs=backtest_kwargs)
+
+    def _tune_parallel(self,
+                       trading_class,
+                       backtest_kwargs: Dict[str, Any],
+                       n_jobs: int,
+                       checkpoint: Dict[tuple, Tuple[str, Dict[str, Any]]]) -> Iterator[tuple]:
+        # results are yielded in the order of the serial tuning
+        frames: List[Tuple[SharedFrame, Dict[str, SharedFrame]]] = []
+        fingerprints: List[str] = []
+        try:
+            for data in self._frames_data:
+                df, frames_m = self._get_frames(data)
+                fingerprints.append(self._fingerprint(df, frames_m))
+                frames.append((SharedFrame(df), {t: SharedFrame(frame) for t, frame in frames_m.items()}))
+            yield from self._run_pool(trading_class=trading_class,
+                                      backtest_kwargs=backtest_kwargs,
+                                      n_jobs=n_jobs,
+                                      frames=frames,
+                                      fingerprints=fingerprints,
+                                      checkpoint=checkpoint)
+        finally:
+            for df, frames_m in frames:
+                df.unlink()
+                for frame in frames_m.values():
+                    frame.unlink()
+
+    def _run_pool(self,
+                  trading_class,
+                  backtest_kwargs: Dict[str, Any],
+                  n_jobs: int,
+                  frames: List[Tuple[SharedFrame, Dict[str, SharedFrame]]],
+                  fingerprints: List[str],
+                  checkpoint: Dict[tuple, Tuple[str, Dict[str, Any]]]):
+        with ProcessPoolExecutor(max_workers=n_jobs,
+                                 initializer=_init_tune_worker,
+                                 initargs=(trading_class, self.client, frames)) as executor:
+            tasks = [(data_index, strategy, kwargs)
+                     for data_index in range(len(self._frames_data))
+                     for strategy, kwargs in self._strategies]
+            done: Dict[int, Tuple[bool, Tuple[str, Dict[str, Any]]]] = {}
+            futures = {}
+            for e, (data_index, strategy, kwargs) in enumerate(tasks):
+                key = self._checkpoint_key(self._frames_data[data_index],
+                                           strategy=strategy,
+                                           kwargs=kwargs,
+                                           fingerprint=fingerprints[data_index])
+                if key in checkpoint:
+                    done[e] = True, checkpoint[key]
+                    continue
+                futures[executor.submit(_tune_task,
+                                        data_index=data_index,
+                                        data=self._frames_data[data_index],
+                                        multi_test=self.multi_test,
+                                        strategy=strategy,
+                                        kwargs=kwargs,
+                                        backtest_kwargs=backtest_kwargs)] = e
+            next_task = 0
+            for future in chain([None], as_completed(futures)):
+                if future is not None:
+                    done[futures[future]] = False, future.result()
+                while next_task in done:
+                    data_index = tasks[next_task][0]
+                    yield (self._frames_data[data_index], fingerprints[data_index], *done.pop(next_task))
+                    next_task += 1
+
     def sort_tunes(self, sort_by: str = 'percentage year profit', drop_na: bool = True) -> dict:
         not_filt = self.result_tunes
         self.result_tunes = dict()
@@ -170,9 +300,14 @@ class QuickTradeTuner(object):
         _saving.write_json(data=self.result_tunes, path=path, indent=utils.TUNER_INDENT)
 
     def load_tunes(self, path: str = 'returns.json', data: dict = {}):
+        """
+        :param path: saved JSON or the journal of tune (.jsonl).
+        """
         not_empty_dict = len(data.items())
         if not_empty_dict:
             self.result_tunes = data
+        elif path.endswith('.jsonl'):
+            self.result_tunes = tunes_from_journal(_saving.JSONLines(path).read())
         else:
             self.result_tunes = _saving.read_json(path=path)
 
@@ -184,6 +319,70 @@ class QuickTradeTuner(object):
         return list(self.result_tunes.items())[-num:]
 
 
+def _tune_combination(trading_class,
+                      client: TradingClient,
+                      multi_test: bool,
+                      data: tuple,
+                      df: DataFrame,
+                      strategy: str,
+                      kwargs: Dict[str, Any],
+                      backtest_kwargs: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    :return: (formatted strategy with arguments, {characteristic: value})
+    """
+    ticker = data[0]
+    interval = data[1]
+    limit = data[2]
+    trader = trading_class(ticker='ALL/ALL' if multi_test else ticker, df=df, interval=interval)
+    trader.set_client(client)
+
+    if multi_test:
+        backtest_kwargs['limit'] = limit
+        kwargs_m = {}
+        for ticker_ in ticker:
+            kwargs_m[ticker_] = [{strategy: kwargs}]
+        trader.multi_backtest(test_config=kwargs_m,
+                              **backtest_kwargs)
+        strat_kw = format_arguments(strategy, kwargs=kwargs)
+    else:
+        trader._get_attr(strategy)(**kwargs)
+        trader.backtest(**backtest_kwargs)
+        strat_kw = trader._registered_strategy
+    return strat_kw, {filter_name: trader._get_attr(filter_attr)
+                      for filter_name, filter_attr in utils.TUNER_CODECONF.items()}
+
+
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_tune_worker(trading_class, client: TradingClient, frames: List[Tuple[SharedFrame, Dict[str, SharedFrame]]]):
+    # zero-copy views of the frames in shared memory
+    _worker_state['trading_class'] = trading_class
+    _worker_state['client'] = client
+    _worker_state['frames'] = [(df.frame(), {t: frame.frame() for t, frame in frames_m.items()})
+                               for df, frames_m in frames]
+
+
+def _tune_task(data_index: int,
+               data: tuple,
+               multi_test: bool,
+               strategy: str,
+               kwargs: Dict[str, Any],
+               backtest_kwargs: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    df, frames = _worker_state['frames'][data_index]
+    if multi_test:
+        # the frames of the parent instead of a request in every worker
+        backtest_kwargs = {**backtest_kwargs, '_dataframes': frames}
+    return _tune_combination(trading_class=_worker_state['trading_class'],
+                             client=_worker_state['client'],
+                             multi_test=multi_test,
+                             data=data,
+                             df=df,
+                             strategy=strategy,
+                             kwargs=kwargs,
+                             backtest_kwargs=backtest_kwargs)
+
+
 class Choise(TunableValue):
     pass
 
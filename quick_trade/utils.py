@@ -1,7 +1,11 @@
+import asyncio
 from enum import Enum
+import hashlib
 import threading
 from functools import wraps
+from random import uniform
 from time import sleep
+from time import time
 from typing import Any
 from typing import List
 from typing import Sequence
@@ -9,6 +13,8 @@ from typing import Sized
 from typing import Tuple
 from typing import Union
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from warnings import warn
 
 import numpy as np
@@ -20,7 +26,6 @@ from numpy import isnan
 from numpy import nan
 from numpy import nan_to_num
 from numpy import ndarray
-from numpy import polyfit
 from pandas import Series
 from collections import defaultdict
 from ._code_inspect import format_arguments
@@ -40,16 +45,26 @@ def strategy(strat):
         registered = format_arguments(func=strat, args=args, kwargs=kwargs)
         self._registered_strategy = registered
 
-        strategy_output = strat(self, *args, **kwargs)
+        # SL/TP methods called by the strategy leave lists, the dtype is applied below
+        self._strategy_depth += 1
+        try:
+            strategy_output = strat(self, *args, **kwargs)
+        finally:
+            self._strategy_depth -= 1
+        # lists of signals are packed once, appending to a SignalArray bar by bar is slower than to a list
+        returns = self.returns
+        self.returns = pack_signals(returns)
+        if strategy_output is returns:
+            strategy_output = self.returns
         self.returns_update()
-        if not len(self.stop_losses):
-            self.set_open_stop_and_take(set_take=False)
-        if not len(self.take_profits):
-            self.set_open_stop_and_take(set_stop=False)
+        if not len(self.stop_losses) or not len(self.take_profits):
+            self.set_open_stop_and_take(set_stop=not len(self.stop_losses),
+                                        set_take=not len(self.take_profits))
         if not len(self.credit_leverages):
             self.set_credit_leverages()
         self.correct_sl_tp(sl_correction=inf,
                            tp_correction=inf)
+        self._apply_dtype('stop_losses', 'take_profits', 'open_lot_prices', 'credit_leverages')
 
         self._registered_strategy = registered
         return strategy_output
@@ -72,6 +87,81 @@ SELL = TradeSide.SELL
 BUY = TradeSide.BUY
 EXIT = TradeSide.EXIT
 
+_SIGNAL_BY_VALUE: Dict[int, TradeSide] = {signal.value: signal for signal in TradeSide}
+
+
+class SignalArray(object):
+    """
+    Compact sequence of signals: TradeSide values in a np.int8 buffer.
+    Items are utils.TradeSide (like in PREDICT_TYPE_LIST), SignalArray.values is the buffer itself.
+    """
+    _buffer: ndarray
+    _length: int
+
+    def __init__(self, signals: Union[PREDICT_TYPE_LIST, ndarray, 'SignalArray'] = ()):
+        self._buffer = np.array(signals_to_array(signals), dtype=np.int8)
+        self._length = len(self._buffer)
+
+    @property
+    def values(self) -> ndarray:
+        return self._buffer[:self._length]
+
+    def changes(self) -> ndarray:
+        """
+        :return: bool mask of new signals (the first signal is always new)
+        """
+        values = self.values
+        mask = np.ones(len(values), dtype=bool)
+        mask[1:] = values[1:] != values[:-1]
+        return mask
+
+    def append(self, signal: PREDICT_TYPE):
+        if self._length == len(self._buffer):
+            self._buffer = np.resize(self._buffer, max(16, 2 * self._length))
+        self._buffer[self._length] = signal.value
+        self._length += 1
+
+    def extend(self, signals: Union[PREDICT_TYPE_LIST, ndarray, 'SignalArray']):
+        values = signals_to_array(signals)
+        self._buffer = np.concatenate((self.values, values))
+        self._length = len(self._buffer)
+
+    def copy(self) -> 'SignalArray':
+        return SignalArray(self)
+
+    def tolist(self) -> PREDICT_TYPE_LIST:
+        return list(map(_SIGNAL_BY_VALUE.__getitem__, self.values.tolist()))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        return map(_SIGNAL_BY_VALUE.__getitem__, self.values.tolist())
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return SignalArray(self.values[item])
+        return _SIGNAL_BY_VALUE[int(self.values[item])]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            self.values[key] = signals_to_array(value)
+        else:
+            self.values[key] = value.value
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (SignalArray, list, tuple)):
+            return len(self) == len(other) and bool(np.all(self.values == signals_to_array(other)))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(self.values, dtype=dtype)
+
+    def __repr__(self) -> str:
+        return f'SignalArray({self.tolist()})'
+
 TEXT_COLOR: str = 'white'
 
 TIME_TITLE: str = 'T I M E'
@@ -134,9 +224,16 @@ TRADE_MARKER_EXIT_ALPHA: float = 1.0
 
 TICKER_PATTERN: str = r'[A-Z0-9]+/[A-Z0-9]+'
 
-WAIT_SUCCESS_SLEEP: float = 1.0
+WAIT_SUCCESS_SLEEP: float = 1.0  # first delay, every next one is WAIT_SUCCESS_BACKOFF times longer
 WAIT_SUCCESS_PRINT: bool = True
 WAIT_SUCCESS_USE: bool = True
+WAIT_SUCCESS_BACKOFF: float = 2.0
+WAIT_SUCCESS_MAX_SLEEP: float = 60.0
+WAIT_SUCCESS_JITTER: float = 0.5  # delay * uniform(1 - jitter, 1 + jitter)
+WAIT_SUCCESS_ATTEMPTS: Union[int, None] = None  # None -- no limit
+WAIT_SUCCESS_DEADLINE: Union[float, None] = None  # seconds, None -- no limit
+WAIT_SUCCESS_BREAKER_FAILURES: int = 5  # consecutive failures of a function to open its circuit breaker
+WAIT_SUCCESS_BREAKER_COOLDOWN: float = 30.0  # seconds without calls of the function after the breaker is opened
 
 MA_FAST_NAME: str = 'SMA{}'  # .format(<SMA length>)
 MA_FAST_COLOR: str = '#55ff00'
@@ -281,31 +378,66 @@ ADDITIONAL_TRADER_ATTRIBUTES: Dict[str, str] = {
     'average_growth': 'average_growth'
 }
 
+OHLCV_COLUMNS: List[str] = ['Open', 'High', 'Low', 'Close', 'Volume']  # columns stored as Trader.dtype
+FLOAT_DTYPES: Tuple[np.dtype, ...] = (np.dtype(np.float64), np.dtype(np.float32))
+INDICATOR_CACHE_BYTES: int = 256 * 1024 ** 2  # LRU eviction of indicators.INDICATOR_CACHE above this size
+
+LEDGER_DTYPE: np.dtype = np.dtype([
+    ('entry', np.int64),  # index of the candle where the trade (or the leverage in multi_trades) was opened
+    ('exit', np.int64),  # index of the candle where the trade was closed (or its stop loss / take profit reached)
+    ('side', np.int8),  # TradeSide value
+    ('entry_price', np.float64),
+    ('exit_price', np.float64),  # stop loss / take profit price if the trade was closed by it
+    ('leverage', np.float64),
+    ('pnl', np.float64),  # deposit after the closing commission minus deposit after the opening commission
+    ('commission', np.float64),  # commission of the opening, of the leverage changes and of the closing
+])
+
 locker = threading.Lock()
 
 
+def _object_array(data: Iterable[Any]) -> ndarray:
+    # 1-d array of the original elements, without numpy trying to unpack or cast them
+    data = list(data)
+    return np.fromiter(data, dtype=object, count=len(data))
+
+
+def forward_fill_index(mask: ndarray) -> ndarray:
+    # index of the last element where mask is True (or the first element) for every position
+    index = arange(len(mask))
+    index[~mask] = 0
+    return np.maximum.accumulate(index)
+
+
 def convert(data: PREDICT_TYPE_LIST) -> CONVERTED_TYPE_LIST:
-    ret: List[Any] = list(data.copy())
-    e: int
-    for e, i in enumerate(data[1:]):
-        if i == data[e]:
-            ret[e + 1] = nan
-    return ret
+    if isinstance(data, SignalArray):
+        converted = data.values.astype(float)
+        converted[~data.changes()] = nan
+        return converted
+    values = _object_array(data)
+    values[1:][values[1:] == values[:-1]] = nan
+    return values.tolist()
+
+
+def converted_mask(converted: CONVERTED_TYPE_LIST) -> ndarray:
+    # bool mask of the new signals (the elements that are not NaN) of a converted sequence
+    if isinstance(converted, ndarray) and converted.dtype != object:
+        return ~isnan(converted)
+    values = _object_array(converted)
+    return values == values  # np.nan is the only element that is not equal to itself
 
 
 def anti_convert(converted: CONVERTED_TYPE_LIST,
                  _nan_num: float = 18699.9) -> PREDICT_TYPE_LIST:
-    converted = nan_to_num(converted, nan=_nan_num)
-    ret: List[Any] = [converted[0]]
-    flag = converted[0]
-    e: int
-    for i in converted[1:]:
-        if i == _nan_num:
-            ret.append(flag)
-        else:
-            ret.append(i)
-            flag = i
-    return ret
+    values = nan_to_num(converted, nan=_nan_num)
+    if values.dtype == object:
+        values = _object_array(converted)
+        filled = values == values  # np.nan is the only element that is not equal to itself
+    else:
+        filled = values != _nan_num
+    if not len(values):
+        return []
+    return values[forward_fill_index(filled)].tolist()
 
 
 def get_window(values: Union[Sequence, Sized], window_length: int) -> List[Any]:
@@ -323,22 +455,56 @@ def convert_signal_str(predict: PREDICT_TYPE) -> str:
     elif predict == EXIT:
         return 'Exit'
 
+def is_nan(value: Any) -> bool:
+    return isinstance(value, float) and isnan(value)
+
 def log_list(values):
-    log_ret = []
-    for value in values:
-        if value >= 0:
-            log_ret.append(np.log(value))
-        else:
-            log_ret.append(-np.log(-value))
-    return array(log_ret)
+    # log of positive values and -log(-value) of negative ones
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(values >= 0, np.log(values), -np.log(-values))
+
+
+def linear_regression(y: ndarray) -> Tuple[ndarray, ndarray]:
+    """
+    Closed-form least squares of y (along the last axis) over x = 1, 2, ..., n.
+
+    :return: (slope, intercept) like np.polyfit(x, y, 1)
+    """
+    n: int = y.shape[-1]
+    x_mean: float = (n + 1) / 2
+    x_centered: ndarray = arange(1, n + 1) - x_mean
+    y_mean: ndarray = y.mean(axis=-1)
+    slope: ndarray = (y * x_centered).sum(axis=-1) / (n * (n * n - 1) / 12)
+    return slope, y_mean - slope * x_mean
+
 
 def get_exponential_growth(dataset: Sequence[float]) -> ndarray:
     x = arange(1, len(dataset) + 1, 1)
-    b, a = polyfit(x, log_list(array(dataset)), 1)
+    b, a = linear_regression(log_list(dataset))
     regression = exp(a + b * x)
     return array(regression)
 
 
+def frame_fingerprint(frame: pd.DataFrame, index: bool = False) -> str:
+    """
+    :param index: also hash the index of the frame.
+    :return: stable hash of the columns and the values of the frame (the same in every process and session).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(frame)).encode())
+    columns: List[Tuple[Any, ndarray]] = [(column, frame[column].to_numpy()) for column in frame.columns]
+    if index:
+        columns.append((None, frame.index.to_numpy()))
+    for column, values in columns:
+        values = np.ascontiguousarray(values)
+        if values.dtype == object:
+            values = pd.util.hash_array(values)
+        digest.update(f'{column}:{values.dtype.str}'.encode())
+        digest.update(values.view(np.uint8))
+    return digest.hexdigest()
+
+
 def get_coef_sec(timeframe: str = '1d') -> Tuple[float, int]:
     profit_calculate_coef: Union[float, int]
     sec_interval: int
@@ -404,22 +570,145 @@ def get_coef_sec(timeframe: str = '1d') -> Tuple[float, int]:
     return profit_calculate_coef, sec_interval
 
 
+class CircuitBreakerOpen(Exception):
+    pass
+
+
+class _WaitSuccessState(object):
+    """
+    Circuit breaker and counters of a function decorated with wait_success (shared by all instances).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.counters: Dict[str, int] = {'calls': 0,
+                                         'successes': 0,
+                                         'failures': 0,
+                                         'retries': 0,
+                                         'gave up': 0,
+                                         'breaker opened': 0}
+
+    def count(self, counter: str):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def success(self):
+        with self.lock:
+            self.counters['successes'] += 1
+            self.consecutive_failures = 0
+
+    def failure(self):
+        with self.lock:
+            self.counters['failures'] += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= WAIT_SUCCESS_BREAKER_FAILURES:
+                self.consecutive_failures = 0
+                self.open_until = time() + WAIT_SUCCESS_BREAKER_COOLDOWN
+                self.counters['breaker opened'] += 1
+
+    def delay(self, attempt: int, start: float) -> Union[float, None]:
+        """
+        :return: seconds to sleep before the next attempt or None if the attempts or the deadline are over.
+        """
+        if WAIT_SUCCESS_ATTEMPTS is not None and attempt >= WAIT_SUCCESS_ATTEMPTS:
+            return None
+        delay = min(WAIT_SUCCESS_SLEEP * WAIT_SUCCESS_BACKOFF ** (attempt - 1), WAIT_SUCCESS_MAX_SLEEP)
+        delay *= uniform(1 - WAIT_SUCCESS_JITTER, 1 + WAIT_SUCCESS_JITTER)
+        delay = max(delay, self.open_until - time())
+        if WAIT_SUCCESS_DEADLINE is not None and time() + delay > start + WAIT_SUCCESS_DEADLINE:
+            return None
+        return delay
+
+
+_wait_success_states: Dict[str, _WaitSuccessState] = defaultdict(_WaitSuccessState)
+
+
+def wait_success_counters() -> Dict[str, Dict[str, int]]:
+    """
+    :return: {function: {counter: value}} of the functions decorated with wait_success.
+    """
+    return {name: dict(state.counters) for name, state in _wait_success_states.items()}
+
+
+def _wait_success_error(state: _WaitSuccessState, error: Exception, attempt: int, start: float) -> float:
+    # the delay before the next attempt (the error is raised if the attempts are over)
+    if not WAIT_SUCCESS_USE or isinstance(error, CircuitBreakerOpen):
+        raise error
+    state.failure()
+    delay = state.delay(attempt=attempt, start=start)
+    if delay is None:
+        state.count('gave up')
+        raise error
+    state.count('retries')
+    if WAIT_SUCCESS_PRINT:
+        print(f'An error occurred: {error}, repeat request in {delay:.2f} seconds')
+    return delay
+
+
+def _wait_success_breaker(state: _WaitSuccessState, name: str, start: float) -> float:
+    # seconds to wait until the breaker is closed
+    wait = state.open_until - time()
+    if wait > 0 and WAIT_SUCCESS_DEADLINE is not None and time() + wait > start + WAIT_SUCCESS_DEADLINE:
+        state.count('gave up')
+        raise CircuitBreakerOpen(f'circuit breaker of {name} is open')
+    return wait
+
+
 def wait_success(func):
+    """
+    If an exception was raised, the call is repeated after an exponential delay with jitter
+    (see utils.WAIT_SUCCESS_* settings). After WAIT_SUCCESS_BREAKER_FAILURES consecutive failures of the function
+    (of all threads) its circuit breaker is opened: calls wait WAIT_SUCCESS_BREAKER_COOLDOWN seconds.
+    """
+    name: str = func.__qualname__
+    state = _wait_success_states[name]
+
     @wraps(func)
     def checker(*args, **kwargs):
+        start = time()
+        attempt = 0
         while True:
+            wait = _wait_success_breaker(state=state, name=name, start=start)
+            if wait > 0:
+                sleep(wait)
+            attempt += 1
+            state.count('calls')
             try:
-                return func(*args, **kwargs)
+                result = func(*args, **kwargs)
             except Exception as e:
-                if not WAIT_SUCCESS_USE:
-                    raise e
-                if not isinstance(e, KeyboardInterrupt):
-                    if WAIT_SUCCESS_PRINT:
-                        print(f'An error occurred: {e}, repeat request')
-                    sleep(WAIT_SUCCESS_SLEEP)
-                    continue
-                else:
-                    raise e
+                sleep(_wait_success_error(state=state, error=e, attempt=attempt, start=start))
+                continue
+            state.success()
+            return result
+
+    return checker
+
+
+def async_wait_success(func):
+    """
+    wait_success for coroutine functions: the repeat is awaited with asyncio.sleep.
+    """
+    name: str = func.__qualname__
+    state = _wait_success_states[name]
+
+    @wraps(func)
+    async def checker(*args, **kwargs):
+        start = time()
+        attempt = 0
+        while True:
+            wait = _wait_success_breaker(state=state, name=name, start=start)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            attempt += 1
+            state.count('calls')
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(_wait_success_error(state=state, error=e, attempt=attempt, start=start))
+                continue
+            state.success()
+            return result
 
     return checker
 
@@ -451,33 +740,525 @@ def get_diff(price: float,
     return 0
 
 
+def get_diff_array(price: ndarray,
+                   low: ndarray,
+                   high: ndarray,
+                   stop_loss: ndarray,
+                   take_profit: ndarray,
+                   signal: ndarray) -> ndarray:
+    """
+    vectorized utils.get_diff, signal is an array of TradeSide values.
+    """
+    buy = signal == BUY.value
+    sell = signal == SELL.value
+    with np.errstate(invalid='ignore'):
+        return np.select([buy & (low <= stop_loss),
+                          sell & (high >= stop_loss),
+                          buy & (high >= take_profit),
+                          sell & (low <= take_profit)],
+                         [stop_loss - price,
+                          stop_loss - price,
+                          take_profit - price,
+                          take_profit - price],
+                         default=0.0)
+
+
+def _trade_side_values(signals: Iterable[Any]) -> Union[ndarray, None]:
+    # values of a sequence of TradeSide (None if there are other elements), compared by identity instead of .value
+    values = _object_array(signals)
+    sides = np.zeros(len(values), dtype=np.int8)
+    known = values == EXIT
+    for side in (BUY, SELL):
+        mask = values == side
+        sides[mask] = side.value
+        known |= mask
+    if known.all():
+        return sides
+
+
+def pack_signals(signals: Union[PREDICT_TYPE_LIST, SignalArray]) -> Union[PREDICT_TYPE_LIST, SignalArray]:
+    """
+    :return: SignalArray of the signals if all of them are TradeSide, the signals themselves otherwise
+    (e.g. lists with np.nan before multi_trades).
+    """
+    if isinstance(signals, list):
+        sides = _trade_side_values(signals)
+        if sides is not None:
+            return SignalArray(sides)
+    return signals
+
+
+def signals_to_array(signals: Union[PREDICT_TYPE_LIST, ndarray, SignalArray]) -> ndarray:
+    if isinstance(signals, SignalArray):
+        return signals.values
+    if isinstance(signals, ndarray) and signals.dtype != object:
+        return signals.astype(np.int8)
+    sides = _trade_side_values(signals)
+    if sides is not None:
+        return sides
+    return np.fromiter((getattr(signal, 'value', signal) for signal in signals), dtype=np.int8, count=len(signals))
+
+
+def min_array(first: ndarray, second: ndarray) -> ndarray:
+    # the same NaN-handling as the built-in min(first, second)
+    return np.where(second < first, second, first)
+
+
+def max_array(first: ndarray, second: ndarray) -> ndarray:
+    # the same NaN-handling as the built-in max(first, second)
+    return np.where(second > first, second, first)
+
+
+def backtest_arrays(signals: ndarray,
+                    stop_losses: ndarray,
+                    take_profits: ndarray,
+                    leverages: ndarray,
+                    close: ndarray,
+                    high: ndarray,
+                    low: ndarray,
+                    deposit: Union[float, int] = 10_000.0,
+                    bet: Union[float, int] = np.inf,
+                    commission: Union[float, int] = 0.0,
+                    multi_trades: bool = False,
+                    ledger: bool = False) -> Tuple[Any, ...]:
+    """
+    Array version of Trader.backtest for several strategies over the same candles.
+
+    :param signals: (strategies x bars) TradeSide values.
+    :param stop_losses: (strategies x bars) stop loss prices.
+    :param take_profits: (strategies x bars) take profit prices.
+    :param leverages: (strategies x bars) credit leverages.
+    :param close: (bars,) close prices.
+    :param high: (bars,) high prices.
+    :param low: (bars,) low prices.
+    :param multi_trades: count trades when the leverage changes (Trader.multi_trades).
+    :param ledger: also return the list of closed trades (LEDGER_DTYPE) of every strategy.
+    :return: (equity, trades, profits, losses, lengths[, ledgers]). If the deal was opened out of range,
+             the equity is filled with NaN after lengths[strategy] points.
+
+    Price differences and stop/take breakouts are calculated on whole arrays.
+    The deposit is only carried from one trade (or leverage change) to the next,
+    so the python loop runs max(trades) times for all strategies at once.
+    """
+    strategies, length = signals.shape
+    bars: int = length - 1
+    equity: ndarray = np.full((strategies, max(length, 1)), np.nan)
+    equity[:, 0] = deposit
+    trades: ndarray = np.zeros(strategies, dtype=int)
+    profits: ndarray = np.zeros(strategies, dtype=int)
+    losses: ndarray = np.zeros(strategies, dtype=int)
+    if bars < 1:
+        if ledger:
+            return equity, trades, profits, losses, np.ones(strategies, dtype=int), \
+                [np.empty(0, dtype=LEDGER_DTYPE) for _ in range(strategies)]
+        return equity, trades, profits, losses, np.ones(strategies, dtype=int)
+
+    rows: ndarray = np.arange(strategies)[:, None]
+    index: ndarray = np.arange(bars)
+    sig: ndarray = signals[:, :-1]
+    in_trade: ndarray = sig != EXIT.value
+    lev: ndarray = leverages[:, :-1]
+
+    new_trade: ndarray = np.ones((strategies, bars), dtype=bool)
+    new_trade[:, 1:] = signals[:, 1:-1] != signals[:, :-2]
+    trade_start: ndarray = np.maximum.accumulate(np.where(new_trade, index, 0), axis=1)
+    open_price: ndarray = close[trade_start]
+    prev_sig: ndarray = np.where(trade_start > 0, signals[rows, trade_start - 1], EXIT.value)
+
+    lower: ndarray = min_array(stop_losses, take_profits)
+    upper: ndarray = max_array(stop_losses, take_profits)
+    prev_stop_losses: ndarray = np.roll(stop_losses, 1, axis=1)[:, :-1]
+    prev_take_profits: ndarray = np.roll(take_profits, 1, axis=1)[:, :-1]
+    with np.errstate(invalid='ignore'):
+        next_not_breakout = (lower[:, :-1] < low[1:]) & (low[1:] <= high[1:]) & (high[1:] < upper[:, :-1])
+        # be careful with e=0: it is always a new trade, so the breakout is ignored
+        now_not_breakout = (np.roll(lower, 1, axis=1)[:, :-1] < low[:-1]) & \
+                           (low[:-1] <= high[:-1]) & \
+                           (high[:-1] < np.roll(upper, 1, axis=1)[:, :-1])
+        out_of_range = ~((lower[:, :-1] <= close[:-1]) & (close[:-1] <= upper[:, :-1]))
+
+    normal: ndarray = new_trade | (now_not_breakout & next_not_breakout)
+    breakout: ndarray = in_trade & ~normal
+
+    diff: ndarray = np.broadcast_to(close[1:] - close[:-1], (strategies, bars))
+    diff_now: ndarray = get_diff_array(price=close[:-1],
+                                       low=low[:-1],
+                                       high=high[:-1],
+                                       stop_loss=prev_stop_losses,
+                                       take_profit=prev_take_profits,
+                                       signal=sig)
+    diff_next: ndarray = get_diff_array(price=close[:-1],
+                                        low=low[1:],
+                                        high=high[1:],
+                                        stop_loss=stop_losses[:, :-1],
+                                        take_profit=take_profits[:, :-1],
+                                        signal=sig)
+    diff = np.where(normal, diff, np.where(now_not_breakout, diff_next, diff_now))
+    diff = np.where(in_trade, diff, 0.0)
+    if ledger:
+        # the trade is closed at the price of the first stop loss / take profit breakout
+        exit_prices: ndarray = close[:-1] + diff
+        # the candle where the stop loss / take profit was reached
+        exit_bars: ndarray = index + now_not_breakout
+        next_breakout: ndarray = np.where(breakout, index, bars)
+        next_breakout = np.minimum.accumulate(next_breakout[:, ::-1], axis=1)[:, ::-1]
+    diff = np.where(sig == SELL.value, -diff, diff)
+
+    # after the stop loss or take profit, there is no order until the next trade
+    breakouts_before: ndarray = np.zeros((strategies, bars), dtype=int)
+    np.cumsum(breakout[:, :-1], axis=1, out=breakouts_before[:, 1:])
+    no_order: ndarray = breakouts_before > breakouts_before[rows, trade_start]
+
+    out_of_range &= new_trade & in_trade & (index > 0)
+    cuts: ndarray = np.where(out_of_range.any(axis=1), out_of_range.argmax(axis=1), bars)
+    valid: ndarray = index < cuts[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        steps: ndarray = np.where(no_order | ~valid, 0.0, lev * diff / open_price)
+    cumulative_steps: ndarray = np.zeros((strategies, length))
+    np.cumsum(steps, axis=1, out=cumulative_steps[:, 1:])
+
+    leverage_changed: ndarray = ~new_trade & in_trade
+    leverage_changed[:, 1:] &= lev[:, 1:] != lev[:, :-1]
+    # the trade closed at the cut is still counted (the loop counts it before checking the range)
+    events: ndarray = (new_trade | leverage_changed) & (index <= cuts[:, None])
+    event_number: ndarray = np.cumsum(events, axis=1) - 1
+    events_count: ndarray = event_number[:, -1] + 1
+    event_rows, event_bars = np.nonzero(events)
+    event_index: ndarray = np.zeros((strategies, events_count.max()), dtype=int)
+    event_index[event_rows, event_number[event_rows, event_bars]] = event_bars
+    event_deposits: ndarray = np.zeros(event_index.shape)
+    event_factors: ndarray = np.zeros(event_index.shape)
+
+    row: ndarray = rows[:, 0]
+    balance: ndarray = np.full(strategies, deposit, dtype=float)
+    bets: ndarray = np.full(strategies, bet, dtype=float)
+    moneys_open_bet: ndarray = balance.copy()
+    entry_index: ndarray = np.zeros(strategies, dtype=int)
+    entry_lev: ndarray = np.ones(strategies)
+    trade_commission: ndarray = np.zeros(strategies)
+    records: List[Tuple[ndarray, ...]] = []
+
+    def record(closed: ndarray, side: ndarray, start: ndarray, closing_commission: ndarray):
+        first_breakout = next_breakout[row, start]
+        stopped = first_breakout < e
+        breakout_bar = np.minimum(first_breakout, bars - 1)
+        exit_price = np.where(stopped, exit_prices[row, breakout_bar], close[e])
+        exit_bar = np.where(stopped, exit_bars[row, breakout_bar], e)
+        records.append(tuple(field[closed] for field in (row, entry_index, exit_bar, side, close[start], exit_price,
+                                                         entry_lev, balance - closing_commission - moneys_open_bet,
+                                                         trade_commission + closing_commission)))
+
+    for n_event in range(event_index.shape[1]):
+        active = n_event < events_count
+        e = event_index[:, n_event]
+        if n_event:
+            last = event_index[:, n_event - 1]
+            balance = np.where(active,
+                               event_deposits[:, n_event - 1] + event_factors[:, n_event - 1] *
+                               (cumulative_steps[row, e] - cumulative_steps[row, last]),
+                               balance)
+        opened = active & new_trade[row, e]
+        changed = active & ~new_trade[row, e]
+        count_trade = prev_sig[row, e] != EXIT.value
+        leverage = leverages[row, e]
+
+        # utils.apply_commission, the first commission closes the previous trade
+        open_bet = np.where(bet > balance, balance, bet)
+        first_commission = open_bet * (commission / 100) * leverage
+        closing_commission = np.where(count_trade, first_commission, 0.0)
+        open_deposit = balance - first_commission
+        open_bet = np.where(open_bet > open_deposit, open_deposit, open_bet)
+        reused = open_deposit - open_bet * (commission / 100) * leverage
+        open_deposit = np.where(count_trade, reused, open_deposit)
+        open_bet = np.where(count_trade & (open_bet > open_deposit), open_deposit, open_bet)
+
+        # Commission when changing the leverage.
+        change_commission = bets * (commission / 100) * np.abs(leverages[row, e - 1] - leverage)
+        change_deposit = balance - change_commission
+        change_bet = np.where(bets > change_deposit, change_deposit, bets)
+
+        # counting trades before the commission of the new trade
+        counted = opened & count_trade
+        trades += counted
+        profits += counted & (balance > moneys_open_bet)
+        losses += counted & (balance < moneys_open_bet)
+        if ledger:
+            record(counted, prev_sig[row, e], trade_start[row, np.maximum(e - 1, 0)], closing_commission)
+
+        trade_commission = np.where(opened, balance - open_deposit - closing_commission,
+                                    np.where(changed, trade_commission + change_commission, trade_commission))
+        balance = np.where(opened, open_deposit, np.where(changed, change_deposit, balance))
+        bets = np.where(opened, open_bet, np.where(changed, change_bet, bets))
+        if multi_trades:
+            counted = changed & count_trade
+            trades += counted
+            profits += counted & (balance > moneys_open_bet)
+            losses += counted & (balance < moneys_open_bet)
+            if ledger:
+                record(counted, sig[row, e], trade_start[row, e], 0.0)
+            # the commission of the change is charged to the closed part of the trade
+            trade_commission = np.where(changed, np.where(count_trade, 0.0, change_commission), trade_commission)
+            opened = opened | changed
+        moneys_open_bet = np.where(opened, balance, moneys_open_bet)
+        entry_index = np.where(opened, e, entry_index)
+        entry_lev = np.where(opened, leverage, entry_lev)
+        event_deposits[:, n_event] = balance
+        event_factors[:, n_event] = np.where(moneys_open_bet < 0, -bets, bets)
+
+    event_number = np.maximum(event_number, 0)
+    equity[:, 1:] = np.where(valid,
+                             event_deposits[rows, event_number] + event_factors[rows, event_number] *
+                             (cumulative_steps[:, 1:] - cumulative_steps[rows, event_index[rows, event_number]]),
+                             np.nan)
+    if ledger:
+        fields = [np.concatenate([np.zeros(0, dtype=int), *column]) for column in zip(*records)] if records else \
+            [np.zeros(0, dtype=int)] * 9
+        trades_ledger = np.empty(len(fields[0]), dtype=LEDGER_DTYPE)
+        for name, column in zip(LEDGER_DTYPE.names, fields[1:]):
+            trades_ledger[name] = column
+        order = np.lexsort((fields[1], fields[0]))
+        trades_ledger = trades_ledger[order]
+        ledgers = np.split(trades_ledger, np.searchsorted(fields[0][order], np.arange(1, strategies)))
+        return equity, trades, profits, losses, cuts + 1, ledgers
+    return equity, trades, profits, losses, cuts + 1
+
+
+class StreamingBacktest(object):
+    """
+    Bar-by-bar version of Trader.backtest with constant-size state.
+
+    Every candle is tested when the next one is known (like in Trader.backtest),
+    so StreamingBacktest.update returns the equity of the candle it has just received.
+    """
+    deposit: float
+    trades: int
+    profits: int
+    losses: int
+    pass_math: bool
+
+    def __init__(self,
+                 deposit: Union[float, int] = 10_000.0,
+                 bet: Union[float, int] = np.inf,
+                 commission: Union[float, int] = 0.0,
+                 multi_trades: bool = False,
+                 ledger: bool = False):
+        """
+        :param deposit: start deposit.
+        :param bet: fixed bet to backtest. np.inf = all deposit.
+        :param commission: percentage commission (0 -- 100).
+        :param multi_trades: count trades at leverage changes (see Trader.multi_trades).
+        :param ledger: collect the closed trades (see StreamingBacktest.ledger).
+        """
+        self.deposit = deposit
+        self.trades = 0
+        self.profits = 0
+        self.losses = 0
+        self.pass_math = False
+        self._start_bet = bet
+        self._bet = bet
+        self._commission = commission
+        self._multi_trades = multi_trades
+        self._moneys_open_bet = deposit
+        self._prev_sig = EXIT
+        self._open_price = nan
+        self._no_order = False
+        self._exit_take_stop = False
+        self._bar: Union[Tuple[Any, ...], None] = None
+        self._prev_bar: Union[Tuple[Any, ...], None] = None
+        self._index = -1
+        self._entry_index = 0
+        self._entry_lev = 1.0
+        self._trade_commission = 0.0
+        self._exit_price = nan
+        self._exit_index = 0
+        self._ledger: Union[List[Tuple[Any, ...]], None] = [] if ledger else None
+
+    @property
+    def closed(self) -> bool:
+        """
+        :return: the trade was closed by the stop loss or the take profit (the deposit waits for a new signal).
+        """
+        return self._exit_take_stop
+
+    @property
+    def ledger(self) -> Union[ndarray, None]:
+        """
+        :return: closed trades (utils.LEDGER_DTYPE) or None if the ledger is not collected.
+        """
+        if self._ledger is None:
+            return None
+        return np.array(self._ledger, dtype=LEDGER_DTYPE)
+
+    def __count_trade(self, side: TradeSide, price: float, closing_commission: float = 0.0):
+        if self._prev_sig != EXIT:
+            self.trades += 1
+            if self.deposit > self._moneys_open_bet:
+                self.profits += 1
+            elif self.deposit < self._moneys_open_bet:
+                self.losses += 1
+            if self._ledger is not None:
+                self._ledger.append((self._entry_index,
+                                     self._index if isnan(self._exit_price) else self._exit_index,
+                                     side.value,
+                                     self._open_price,
+                                     price if isnan(self._exit_price) else self._exit_price,
+                                     self._entry_lev,
+                                     self.deposit - closing_commission - self._moneys_open_bet,
+                                     self._trade_commission + closing_commission))
+
+    def update(self,
+               close: float,
+               high: float,
+               low: float,
+               signal: PREDICT_TYPE,
+               stop_loss: float = -inf,
+               take_profit: float = inf,
+               credit_leverage: Union[float, int] = 1.0) -> float:
+        """
+        :param close: close price of the new candle.
+        :param high: high price of the new candle.
+        :param low: low price of the new candle.
+        :param signal: signal of the strategy at this candle.
+        :param stop_loss: stop loss price at this candle.
+        :param take_profit: take profit price at this candle.
+        :param credit_leverage: credit leverage at this candle.
+        :return: deposit at this candle. After the trade was opened out of range (pass_math) candles are ignored.
+        """
+        if not isinstance(signal, TradeSide):
+            signal = TradeSide(signal)
+        # python floats: np.float32 data (Trader.dtype) must not lower the precision of the deposit
+        next_bar = (float(close), float(high), float(low), signal, float(stop_loss), float(take_profit),
+                    float(credit_leverage))
+        if self._bar is not None and not self.pass_math:
+            self.__test_bar(next_bar)
+        if not self.pass_math:
+            self._prev_bar, self._bar = self._bar, next_bar
+            self._index += 1
+        return self.deposit
+
+    def __test_bar(self, next_bar: Tuple[Any, ...]):
+        price, high, low, sig, stop_loss, take_profit, credit_lev = self._bar
+        next_price, next_h, next_l, next_sig = next_bar[:4]
+        new_signal: bool = self._prev_bar is None or self._prev_bar[3] != sig
+        diff: float
+
+        if new_signal:
+            closing_commission: float = 0.0
+            if self._prev_sig != EXIT:
+                # the first commission of apply_commission closes the previous trade
+                closing_commission = min(self._start_bet, self.deposit) * (self._commission / 100) * credit_lev
+            # count the number of profitable and unprofitable trades.
+            self.__count_trade(side=self._prev_sig, price=price, closing_commission=closing_commission)
+
+            # calculating commission
+            self._trade_commission = self.deposit
+            self._bet, self.deposit = apply_commission(deposit=self.deposit,
+                                                       pct_commission=self._commission,
+                                                       prev_trade=self._prev_sig,
+                                                       bet=self._start_bet,
+                                                       leverage=credit_lev)
+
+            self._trade_commission -= self.deposit
+            self._trade_commission -= closing_commission
+            self._entry_index = self._index
+            self._entry_lev = credit_lev
+            self._exit_price = nan
+
+            # reset service variables
+            self._open_price = price
+            self._moneys_open_bet = self.deposit
+            self._no_order = False
+            self._exit_take_stop = False
+
+            if sig != EXIT and not min(stop_loss, take_profit) <= price <= max(stop_loss, take_profit) and \
+                    self._prev_bar is not None:
+                self.pass_math = True
+                return
+
+        if sig != EXIT:
+            if new_signal:
+                diff = next_price - price
+            else:
+                next_not_breakout = min(stop_loss, take_profit) < next_l <= next_h < max(stop_loss, take_profit)
+                prev_stop_loss, prev_take_profit, prev_lev = self._prev_bar[4:]
+                now_not_breakout = min(prev_stop_loss, prev_take_profit) < low <= high < max(prev_stop_loss,
+                                                                                             prev_take_profit)
+
+                if credit_lev != prev_lev:
+                    change_commission = self._bet * (self._commission / 100) * abs(prev_lev - credit_lev)
+                    self.deposit -= change_commission
+                    self._trade_commission += change_commission
+                    # Commission when changing the leverage.
+                    if self._bet > self.deposit:
+                        self._bet = self.deposit
+
+                    if self._multi_trades:
+                        self.__count_trade(side=sig, price=price)
+                        self._moneys_open_bet = self.deposit
+                        self._entry_index = self._index
+                        self._entry_lev = credit_lev
+                        # the commission of the change is charged to the closed part of the trade
+                        self._trade_commission = change_commission if self._prev_sig == EXIT else 0.0
+
+                if now_not_breakout and next_not_breakout:
+                    diff = next_price - price
+                else:
+                    self._exit_take_stop = True
+                    if not now_not_breakout:
+                        diff = get_diff(price=price,
+                                        low=low,
+                                        high=high,
+                                        stop_loss=prev_stop_loss,
+                                        take_profit=prev_take_profit,
+                                        signal=sig)
+                    else:
+                        diff = get_diff(price=price,
+                                        low=next_l,
+                                        high=next_h,
+                                        stop_loss=stop_loss,
+                                        take_profit=take_profit,
+                                        signal=sig)
+                    if isnan(self._exit_price):
+                        self._exit_price = price + diff
+                        # the candle where the stop loss / take profit was reached
+                        self._exit_index = self._index if not now_not_breakout else self._index + 1
+        else:
+            diff = 0.0
+        if sig == SELL:
+            diff = -diff
+        if self._moneys_open_bet < 0:
+            diff = -diff
+        if not self._no_order:
+            self.deposit += self._bet * credit_lev * diff / self._open_price
+
+        self._no_order = self._exit_take_stop
+        if next_sig != sig:
+            self._prev_sig = sig
+
+    def run(self, bars: Iterable[Tuple[Any, ...]]) -> Iterator[float]:
+        """
+        :param bars: (close, high, low, signal, stop loss, take profit, credit leverage) of every candle.
+        :return: iterator of deposits, which stops when the trade was opened out of range.
+        """
+        for bar in bars:
+            deposit = self.update(*bar)
+            if self.pass_math:
+                return
+            yield deposit
+
+
 def make_multi_trade_returns(converted_returns: CONVERTED_TYPE_LIST) -> Tuple[PREDICT_TYPE_LIST, List[int]]:
     if EXIT in converted_returns:
         warn('The use of utils.EXIT is deprecated in this type of strategy. '
              'If utils.EXIT is the first item in the sequence, you can replace it with np.nan.')
-    result_credlev: List[int] = []
-    result_returns: PREDICT_TYPE_LIST = [BUY] * len(converted_returns)
-    flag_lev: int = 0
-    if isnan(converted_returns[0]):
+    if is_nan(converted_returns[0]):
         converted_returns[0] = EXIT
-    ret: CONVERTED_TYPE
-    for ret in converted_returns:
-        if not isnan(ret):
-            if ret is BUY:
-                flag_lev += 1
-            elif ret is SELL:
-                flag_lev -= 1
-        result_credlev.append(flag_lev)
-    e: int
-    lev: int
-    for e, lev in enumerate(result_credlev):
-        if lev < 0:
-            result_credlev[e] = -lev
-            result_returns[e] = SELL
-        elif lev == 0:
-            result_credlev[e] = 1
-            result_returns[e] = EXIT
-    return result_returns, result_credlev
+    values = _object_array(converted_returns)
+    steps = (values == BUY).astype(np.int64) - (values == SELL).astype(np.int64)
+    flag_lev = np.cumsum(steps)
+    result_credlev = np.abs(flag_lev)
+    result_credlev[flag_lev == 0] = 1
+    return SignalArray(np.sign(flag_lev)), result_credlev.tolist()
 
 
 def get_multipliers(df: pd.Series) -> pd.Series:
@@ -512,27 +1293,29 @@ def recursive_dict(base={}):
     get_dd_base = lambda b: defaultdict(get_dd, b)
     return map_dict(get_dd_base, base)
 
-def strategy_characteristics(equity, timeframe, profit_trades=0, trades=0):
+def strategy_characteristics(equity, timeframe, profit_trades=0, trades=0, additional=True):
+    equity = np.ascontiguousarray(equity, dtype=np.float64)
     average_growth = get_exponential_growth(equity)
-    _mean_deviation = mean_deviation(pd.Series(equity), average_growth) * 100
+    _mean_deviation = np.mean(np.abs(equity - average_growth) / average_growth) * 100
 
     # Sharpe ratio
     profit_calc_coef = get_coef_sec(timeframe)[0]
 
-    returns = get_multipliers(pd.Series(equity)) - 1
+    returns = np.zeros(len(equity))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = equity[1:] / equity[:-1] - 1
+    returns = returns[~np.isnan(returns)]  # like pd.Series.mean/std
 
-    mean_ = returns.mean() * profit_calc_coef
-    sigma = returns.std() * np.sqrt(profit_calc_coef)
+    mean_ = _sample_mean(returns) * profit_calc_coef
+    sigma = _sample_std(returns) * np.sqrt(profit_calc_coef)
     sharpe_ratio = mean_ / sigma
 
     # Sortino ratio
-    sigma = returns[returns < 0].std() * np.sqrt(profit_calc_coef)
+    sigma = _sample_std(returns[returns < 0]) * np.sqrt(profit_calc_coef)
     sortino_ratio = mean_ / sigma
 
     # max drawdown
-    max_returns = np.fmax.accumulate(equity)
-    res = equity / max_returns - 1
-    max_drawdown = abs(min(res) * 100)
+    max_drawdown = _max_drawdown(equity)
 
     # average year profit
     _year_profit = year_profit(average_growth, profit_calc_coef)
@@ -542,15 +1325,12 @@ def strategy_characteristics(equity, timeframe, profit_trades=0, trades=0):
     else:
         winrate = (profit_trades / trades) * 100
 
-    calmar_ratio = _year_profit / max_drawdown
+    with np.errstate(divide='ignore', invalid='ignore'):
+        calmar_ratio = np.float64(_year_profit) / max_drawdown
 
-    # net returns
-    net_returns = pd.Series(equity).diff()
-    net_returns[0] = 0.0
+        profit_deviation_ratio = np.float64(_year_profit) / _mean_deviation
 
-    profit_deviation_ratio = _year_profit / _mean_deviation
-
-    return {
+    characteristics = {
         'winrate': winrate,
         'trades': trades,
         'losses': trades-profit_trades,
@@ -562,9 +1342,269 @@ def strategy_characteristics(equity, timeframe, profit_trades=0, trades=0):
         'calmar ratio': calmar_ratio,
         'max drawdown': max_drawdown,
         'profit/deviation ratio': profit_deviation_ratio,
-        'net_returns': net_returns,
-        'average_growth': average_growth
     }
+    if additional:
+        # net returns
+        net_returns = pd.Series(equity).diff()
+        net_returns[0] = 0.0
+
+        characteristics['net_returns'] = net_returns
+        characteristics['average_growth'] = average_growth
+    return characteristics
+
+
+def strategy_characteristics_batch(equity_matrix: ndarray,
+                                   timeframe: str,
+                                   profit_trades: Union[ndarray, int] = 0,
+                                   trades: Union[ndarray, int] = 0) -> pd.DataFrame:
+    """
+    strategy_characteristics of many equity curves of the same length.
+
+    :param equity_matrix: (curves x bars) equity.
+    :param timeframe: timeframe of the candles.
+    :param profit_trades: number of profitable trades of every curve.
+    :param trades: number of trades of every curve.
+    :return: pd.DataFrame with TUNER_CODECONF characteristics of every curve (row).
+    """
+    equity: ndarray = np.atleast_2d(np.asarray(equity_matrix, dtype=np.float64))
+    curves, length = equity.shape
+    profit_trades = np.broadcast_to(profit_trades, curves)
+    trades = np.broadcast_to(trades, curves)
+
+    slope, intercept = linear_regression(log_list(equity))
+    average_growth: ndarray = exp(intercept[:, None] + slope[:, None] * arange(1, length + 1))
+    _mean_deviation: ndarray = np.mean(np.abs(equity - average_growth) / average_growth, axis=1) * 100
+
+    # Sharpe ratio
+    profit_calc_coef = get_coef_sec(timeframe)[0]
+
+    returns: ndarray = np.zeros(equity.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[:, 1:] = equity[:, 1:] / equity[:, :-1] - 1
+    valid: ndarray = ~np.isnan(returns)  # like pd.Series.mean/std
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_ = _masked_mean(returns, valid) * profit_calc_coef
+        sigma = _masked_std(returns, valid) * np.sqrt(profit_calc_coef)
+        sharpe_ratio = mean_ / sigma
+
+        # Sortino ratio
+        sigma = _masked_std(returns, valid & (returns < 0)) * np.sqrt(profit_calc_coef)
+        sortino_ratio = mean_ / sigma
+
+        # max drawdown
+        max_drawdown = _max_drawdown(equity)
+
+        # average year profit
+        _year_profit = (average_growth[:, 1] / average_growth[:, 0]) ** (profit_calc_coef - 1)
+        _year_profit = (_year_profit - 1) * 100
+
+        winrate = np.where(trades == 0, 0, profit_trades / trades * 100)
+
+        calmar_ratio = _year_profit / max_drawdown
+        profit_deviation_ratio = _year_profit / _mean_deviation
+
+    return pd.DataFrame({
+        'winrate': winrate,
+        'trades': trades,
+        'losses': trades - profit_trades,
+        'profits': profit_trades,
+        'percentage year profit': _year_profit,
+        'mean deviation': _mean_deviation,
+        'Sharpe ratio': sharpe_ratio,
+        'Sortino ratio': sortino_ratio,
+        'calmar ratio': calmar_ratio,
+        'max drawdown': max_drawdown,
+        'profit/deviation ratio': profit_deviation_ratio,
+    }, columns=list(TUNER_CODECONF))
+
+
+def _masked_mean(values: ndarray, mask: ndarray) -> ndarray:
+    return np.where(mask, values, 0).sum(axis=1) / mask.sum(axis=1)
+
+
+def _masked_std(values: ndarray, mask: ndarray) -> ndarray:
+    # standard deviation with ddof=1 (NaN for less than 2 values) of the masked values of every row
+    count = mask.sum(axis=1)
+    deviation = np.where(mask, values - _masked_mean(values, mask)[:, None], 0)
+    return np.where(count < 2, nan, np.sqrt((deviation ** 2).sum(axis=1) / (count - 1)))
+
+
+def _max_drawdown(equity: ndarray) -> Union[ndarray, float]:
+    # max drawdown in percents along the last axis, NaN are skipped
+    with np.errstate(divide='ignore', invalid='ignore'):
+        res = equity / np.fmax.accumulate(equity, axis=-1) - 1
+    return np.abs(np.where(np.isnan(res), np.inf, res).min(axis=-1) * 100)
+
+
+def _sample_mean(values: ndarray) -> float:
+    if not len(values):
+        return nan
+    return values.sum() / len(values)
+
+
+def _sample_std(values: ndarray) -> float:
+    # standard deviation with ddof=1 (NaN for less than 2 values)
+    if len(values) < 2:
+        return nan
+    return np.sqrt(((values - values.sum() / len(values)) ** 2).sum() / (len(values) - 1))
+
+
+class OnlineMetrics(object):
+    """
+    Equity characteristics (like strategy_characteristics), updated in O(1) with every new equity value.
+
+    Returns are accumulated with Welford's algorithm (all of them for the Sharpe ratio and the negative ones
+    for the Sortino ratio), the regression of the log equity with running means and co-moment of (x, log equity).
+    The mean deviation depends on the whole equity, so it is calculated only if the history is passed.
+    """
+    length: int
+    peak: float
+    max_drawdown: float
+
+    def __init__(self, timeframe: str = '1d'):
+        """
+        :param timeframe: timeframe of the equity values.
+        """
+        self._profit_calc_coef = get_coef_sec(timeframe)[0]
+        self.length = 0
+        self.peak = nan
+        self.max_drawdown = 0.0
+        self._last = nan
+        self._returns = [0, 0.0, 0.0]  # count, mean, sum of squared deviations
+        self._negative_returns = [0, 0.0, 0.0]
+        self._x_mean = 0.0
+        self._y_mean = 0.0
+        self._x_moment = 0.0
+        self._xy_moment = 0.0
+
+    @staticmethod
+    def __welford(state: List[Union[int, float]], value: float):
+        state[0] += 1
+        delta = value - state[1]
+        state[1] += delta / state[0]
+        state[2] += delta * (value - state[1])
+
+    @staticmethod
+    def __std(state: List[Union[int, float]]) -> float:
+        if state[0] < 2:
+            return nan
+        return np.sqrt(state[2] / (state[0] - 1))
+
+    def update(self, equity: float) -> 'OnlineMetrics':
+        """
+        :param equity: new equity value.
+        :return: self
+        """
+        equity = float(equity)
+        self.length += 1
+
+        if self.length == 1:
+            ret = 0.0
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ret = np.float64(equity) / self._last - 1
+        if not isnan(ret):  # like pd.Series.mean/std
+            self.__welford(self._returns, ret)
+            if ret < 0:
+                self.__welford(self._negative_returns, ret)
+        self._last = equity
+
+        self.peak = np.fmax(self.peak, equity)
+        drawdown = abs((equity / self.peak - 1) * 100)
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+
+        # x = 1, 2, ..., length
+        log_equity = float(log_list(equity))
+        dx = self.length - self._x_mean
+        self._x_mean += dx / self.length
+        self._y_mean += (log_equity - self._y_mean) / self.length
+        self._x_moment += dx * (self.length - self._x_mean)
+        self._xy_moment += dx * (log_equity - self._y_mean)
+        return self
+
+    def extend(self, equity: Iterable[float]) -> 'OnlineMetrics':
+        """
+        :param equity: new equity values.
+        :return: self
+        """
+        for value in equity:
+            self.update(value)
+        return self
+
+    @property
+    def regression(self) -> Tuple[float, float]:
+        """
+        :return: (slope, intercept) of the log equity like linear_regression.
+        """
+        if not self._x_moment:
+            return nan, nan
+        slope = self._xy_moment / self._x_moment
+        return slope, self._y_mean - slope * self._x_mean
+
+    def average_growth(self) -> ndarray:
+        """
+        :return: exponential regression of the equity (like get_exponential_growth), O(length).
+        """
+        slope, intercept = self.regression
+        return exp(intercept + slope * arange(1, self.length + 1))
+
+    @property
+    def year_profit(self) -> float:
+        with np.errstate(over='ignore', invalid='ignore'):
+            return (exp(self.regression[0]) ** (self._profit_calc_coef - 1) - 1) * 100
+
+    @property
+    def sharpe_ratio(self) -> float:
+        if not self._returns[0]:
+            return nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._returns[1] * np.sqrt(self._profit_calc_coef) / self.__std(self._returns)
+
+    @property
+    def sortino_ratio(self) -> float:
+        if not self._returns[0]:
+            return nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self._returns[1] * np.sqrt(self._profit_calc_coef) / self.__std(self._negative_returns)
+
+    @property
+    def calmar_ratio(self) -> float:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.float64(self.year_profit) / self.max_drawdown
+
+    def characteristics(self,
+                        profit_trades: int = 0,
+                        trades: int = 0,
+                        equity: Union[Sequence[float], None] = None) -> Dict[str, Any]:
+        """
+        :param profit_trades: number of profitable trades.
+        :param trades: number of trades.
+        :param equity: history of the equity values for the mean deviation (NaN without it).
+        :return: characteristics with the keys of TUNER_CODECONF.
+        """
+        if equity is None:
+            _mean_deviation = nan
+        else:
+            average_growth = self.average_growth()
+            _mean_deviation = np.mean(np.abs(np.asarray(equity, dtype=np.float64) - average_growth) /
+                                      average_growth) * 100
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_deviation_ratio = np.float64(self.year_profit) / _mean_deviation
+        return {
+            'winrate': (profit_trades / trades) * 100 if trades else 0,
+            'trades': trades,
+            'losses': trades - profit_trades,
+            'profits': profit_trades,
+            'percentage year profit': self.year_profit,
+            'mean deviation': _mean_deviation,
+            'Sharpe ratio': self.sharpe_ratio,
+            'Sortino ratio': self.sortino_ratio,
+            'calmar ratio': self.calmar_ratio,
+            'max drawdown': self.max_drawdown,
+            'profit/deviation ratio': profit_deviation_ratio,
+        }
 
 
 def apply_commission(deposit: float,
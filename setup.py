@@ -46,5 +46,5 @@ setup(
         'Intended Audience :: Financial and Insurance Industry',
         'Programming Language :: Python :: 3',
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.8',
 )
@@ -0,0 +1,201 @@
+import warnings
+from math import isnan
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quick_trade import utils
+from quick_trade.plots import TraderGraph
+from quick_trade.trading_sys import ExampleStrategies
+
+SEEDS = [0, 1, 2]
+ENGINES = ['vectorized', 'stream']
+STRATEGIES = [
+    ('strategy_2_sma', dict(plot=False)),
+    ('strategy_3_sma', dict(plot=False)),
+    ('strategy_supertrend', dict(plot=False)),
+    ('strategy_parabolic_SAR', dict(plot=False)),
+    ('strategy_rsi', dict()),
+    ('strategy_idris', dict()),
+    ('DP_strategy', dict()),
+    ('new_macd_strategy', dict()),
+    ('strategy_bollinger', dict(plot=False, to_mid=True)),
+    ('strategy_bollinger_breakout', dict(plot=False, to_opposite=True)),
+    ('strategy_price_channel', dict(plot=False)),
+    ('strategy_buy_hold', dict()),
+]
+
+
+def make_df(n: int = 600, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    opn = np.r_[close[0], close[:-1]]
+    high = np.maximum(opn, close) * (1 + rng.uniform(0, 0.01, n))
+    low = np.minimum(opn, close) * (1 - rng.uniform(0, 0.01, n))
+    return pd.DataFrame({'time': np.arange(n) * 3_600_000.0,
+                         'Open': opn,
+                         'High': high,
+                         'Low': low,
+                         'Close': close,
+                         'Volume': rng.uniform(1, 10, n)})
+
+
+def make_signals(n: int = 500, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    # long runs of the same signal, like the output of a strategy
+    return [utils.TradeSide(side) for side in np.repeat(rng.integers(-1, 2, n // 5), 5)]
+
+
+def values(sequence) -> list:
+    return [item.value if isinstance(item, utils.TradeSide) else float(item) for item in sequence]
+
+
+def assert_same(first, second):
+    assert len(first) == len(second)
+    for a, b in zip(values(first), values(second)):
+        assert a == b or (isnan(a) and isnan(b))
+
+
+# the bar-by-bar implementations, which were replaced by the array versions
+def loop_convert(data):
+    ret = list(data.copy())
+    for e, i in enumerate(data[1:]):
+        if i == data[e]:
+            ret[e + 1] = np.nan
+    return ret
+
+
+def loop_anti_convert(converted, _nan_num: float = 18699.9):
+    converted = [_nan_num if not isinstance(i, utils.TradeSide) and isnan(i) else i for i in converted]
+    ret = [converted[0]]
+    flag = converted[0]
+    for i in converted[1:]:
+        if i == _nan_num:
+            ret.append(flag)
+        else:
+            ret.append(i)
+            flag = i
+    return ret
+
+
+def loop_make_multi_trade_returns(converted_returns):
+    result_credlev = []
+    result_returns = [utils.BUY] * len(converted_returns)
+    flag_lev = 0
+    if utils.is_nan(converted_returns[0]):
+        converted_returns[0] = utils.EXIT
+    for ret in converted_returns:
+        if not utils.is_nan(ret):
+            if ret is utils.BUY:
+                flag_lev += 1
+            elif ret is utils.SELL:
+                flag_lev -= 1
+        result_credlev.append(flag_lev)
+    for e, lev in enumerate(result_credlev):
+        if lev < 0:
+            result_credlev[e] = -lev
+            result_returns[e] = utils.SELL
+        elif lev == 0:
+            result_credlev[e] = 1
+            result_returns[e] = utils.EXIT
+    return result_returns, result_credlev
+
+
+def loop_correct_sl_tp(stop_losses, closes, returns, converted, sl_correction):
+    stop_losses = list(stop_losses)
+    for e, (sl, p, sig, conv) in enumerate(zip(list(stop_losses), closes, returns, converted)):
+        if sig == utils.SELL:
+            if not utils.is_nan(conv):
+                correct_sl = p * (1 + sl_correction / 10_000)
+                correct_sl_use = False
+            if p < sl:
+                correct_sl_use = True
+            stop_losses[e] = sl if correct_sl_use else correct_sl
+        elif sig == utils.BUY:
+            if not utils.is_nan(conv):
+                correct_sl = p * (1 - sl_correction / 10_000)
+                correct_sl_use = False
+            if p > sl:
+                correct_sl_use = True
+            stop_losses[e] = sl if correct_sl_use else correct_sl
+    return stop_losses
+
+
+def trader(df: pd.DataFrame) -> ExampleStrategies:
+    trader = ExampleStrategies('BTC/USDT', df, '1h')
+    trader.connect_graph(TraderGraph())
+    return trader
+
+
+def run(df: pd.DataFrame, strategy: str, kwargs: dict, multi_trades: bool = False, **backtest_kwargs):
+    tested = trader(df)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        tested._get_attr(strategy)(**kwargs)
+        if multi_trades:
+            tested.multi_trades()
+        tested.backtest(plot=False, show=False, print_out=False, commission=0.1, **backtest_kwargs)
+    return tested
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_convert(seed):
+    signals = make_signals(seed=seed)
+    assert_same(utils.convert(signals), loop_convert(signals))
+    assert_same(utils.convert(utils.SignalArray(signals)), loop_convert(signals))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_anti_convert(seed):
+    converted = loop_convert(make_signals(seed=seed))
+    assert_same(utils.anti_convert(converted), loop_anti_convert(converted))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_make_multi_trade_returns(seed):
+    rng = np.random.default_rng(seed)
+    converted = [utils.TradeSide(side) if rng.random() < 0.2 else np.nan for side in rng.choice([-1, 1], 500)]
+    converted[0] = np.nan
+    returns, leverages = utils.make_multi_trade_returns(list(converted))
+    expected_returns, expected_leverages = loop_make_multi_trade_returns(list(converted))
+    assert_same(returns, expected_returns)
+    assert list(leverages) == expected_leverages
+
+
+@pytest.mark.parametrize('sl_correction', [30, np.inf])
+@pytest.mark.parametrize('strategy, kwargs', STRATEGIES[:6])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_correct_sl_tp(seed, strategy, kwargs, sl_correction):
+    tested = trader(make_df(seed=seed))
+    tested._get_attr(strategy)(**kwargs)
+    tested.set_open_stop_and_take(stop_loss=80, take_profit=120)
+    expected = loop_correct_sl_tp(tested.stop_losses,
+                                  tested.df['Close'].values,
+                                  list(tested.returns),
+                                  list(tested._converted),
+                                  sl_correction)
+    tested.correct_sl_tp(sl_correction=sl_correction, tp_correction=sl_correction)
+    np.testing.assert_array_equal(tested.stop_losses, expected)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('strategy, kwargs', STRATEGIES)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_deposit_history(seed, strategy, kwargs, engine):
+    df = make_df(seed=seed)
+    loop = run(df, strategy, kwargs, engine='loop')
+    tested = run(df, strategy, kwargs, engine=engine)
+    np.testing.assert_allclose(tested.deposit_history, loop.deposit_history, rtol=1e-9)
+    assert (tested.trades, tested.profits, tested.losses) == (loop.trades, loop.profits, loop.losses)
+    pd.testing.assert_frame_equal(tested.backtest_out, loop.backtest_out, rtol=1e-9)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_multi_trades(seed, engine):
+    df = make_df(seed=seed)
+    loop = run(df, 'strategy_2_sma', dict(plot=False), multi_trades=True, engine='loop')
+    tested = run(df, 'strategy_2_sma', dict(plot=False), multi_trades=True, engine=engine)
+    np.testing.assert_allclose(tested.deposit_history, loop.deposit_history, rtol=1e-9)
+    assert (tested.trades, tested.profits, tested.losses) == (loop.trades, loop.profits, loop.losses)
@@ -0,0 +1,289 @@
+import asyncio
+import sys
+import threading
+import warnings
+from time import sleep
+
+import ccxt
+import numpy as np
+import pytest
+
+from quick_trade import brokers
+from quick_trade import utils
+from quick_trade.brokers import AsyncTradingClient, CachedTradingClient, PricePoller, TradingClient
+
+MINUTE = 60_000
+START = 1_600_000_000_000
+CANDLES = 2_500
+
+
+def candle(time: int) -> list:
+    price = 100.0 + (time - START) / MINUTE
+    return [float(time), price, price + 1, price - 1, price + 0.5, 10.0]
+
+
+class FakeExchange(object):
+    """
+    Local exchange with CANDLES 1m candles from START, fails the first -failures requests
+    and returns at most -page_size candles per request.
+    """
+    id = 'fake'
+    rateLimit = 0
+
+    def __init__(self, failures: int = 0, delay: float = 0.0, page_size: int = None):
+        self.failures = failures
+        self.delay = delay
+        self.page_size = page_size
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=1000):
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            failed = self.failures > 0
+            self.failures -= failed
+        try:
+            sleep(self.delay)
+            if failed:
+                raise ConnectionError('fake network error')
+            if self.page_size is not None:
+                limit = min(limit, self.page_size)
+            if since is None:
+                since = START + (CANDLES - limit) * MINUTE
+            first = max(since, START)
+            last = min(since + limit * MINUTE, START + CANDLES * MINUTE)
+            return [candle(time) for time in range(first, last, MINUTE)]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class FakeTickersExchange(FakeExchange):
+    has = {'fetchTickers': True}
+
+    def __init__(self, closes: dict):
+        super().__init__()
+        self.closes = closes
+
+    def fetch_tickers(self, symbols=None):
+        return {symbol: {'symbol': symbol, 'close': self.closes[symbol]} for symbol in symbols}
+
+    def fetch_ticker(self, symbol):
+        return {'symbol': symbol, 'close': 50.0}
+
+
+class FakeAsyncExchange(FakeExchange):
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        super().__init__(failures=failures, delay=0.0)
+        self.async_delay = delay
+        self.closed = False
+        self.orders = []
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=1000):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.async_delay)
+        finally:
+            self.active -= 1
+        return super().fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+
+    async def fetch_ticker(self, symbol):
+        return {'symbol': symbol, 'close': 123.5}
+
+    async def fetch_free_balance(self):
+        return {'USDT': 1000.0}
+
+    async def create_market_buy_order(self, symbol, amount, params=None):
+        self.orders.append(('buy', symbol, amount, params))
+
+    async def create_market_sell_order(self, symbol, amount, params=None):
+        self.orders.append(('sell', symbol, amount, params))
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(utils, 'WAIT_SUCCESS_SLEEP', 0.001)
+    monkeypatch.setattr(utils, 'WAIT_SUCCESS_JITTER', 0.0)
+    monkeypatch.setattr(utils, 'WAIT_SUCCESS_PRINT', False)
+    monkeypatch.setattr(utils, 'WAIT_SUCCESS_BREAKER_FAILURES', 1_000)
+
+
+def test_historical_range_pages():
+    exchange = FakeExchange(delay=0.01)
+    client = TradingClient(exchange)
+    data = client.get_data_historical_range('BTC/USDT',
+                                            interval='1m',
+                                            since=START,
+                                            until=START + 2_000 * MINUTE,
+                                            limit=300,
+                                            workers=4)
+    assert len(data) == 2_000
+    assert np.all(np.diff(data['time'].values) == MINUTE)
+    assert data['time'].iloc[0] == START
+    assert exchange.requests == 7
+    assert 1 < exchange.max_active <= 4
+
+
+def test_historical_range_end_of_history():
+    client = TradingClient(FakeExchange())
+    data = client.get_data_historical_range('BTC/USDT',
+                                            since=START - 100 * MINUTE,
+                                            until=START + (CANDLES + 100) * MINUTE,
+                                            limit=1000)
+    assert len(data) == CANDLES
+    assert data['time'].is_unique
+
+
+def test_historical_range_short_pages():
+    exchange = FakeExchange(page_size=500)
+    client = TradingClient(exchange)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        data = client.get_data_historical_range('BTC/USDT', since=START, until=START + 2_000 * MINUTE, limit=1000)
+    assert len(data) == 2_000
+    assert np.all(np.diff(data['time'].values) == MINUTE)
+    assert exchange.requests == 4
+
+
+def test_historical_range_holes_warning():
+    class HoleExchange(FakeExchange):
+        def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=1000):
+            return [row for row in super().fetch_ohlcv(symbol, timeframe, since, limit)
+                    if row[0] != START + 100 * MINUTE]
+
+    client = TradingClient(HoleExchange())
+    with pytest.warns(UserWarning, match='1 holes'):
+        data = client.get_data_historical_range('BTC/USDT', since=START, until=START + 500 * MINUTE, limit=200)
+    assert len(data) == 499
+
+
+def test_historical_range_retry():
+    exchange = FakeExchange(failures=2)
+    client = TradingClient(exchange)
+    data = client.get_data_historical_range('BTC/USDT', since=START, until=START + 500 * MINUTE, limit=100)
+    assert len(data) == 500
+    assert exchange.requests == 7
+
+
+def test_async_many_data_historical():
+    async def main():
+        exchange = FakeAsyncExchange(delay=0.01)
+        client = AsyncTradingClient(exchange, max_concurrency=3)
+        frames = await client.get_many_data_historical([f'T{e}/USDT' for e in range(10)], limit=50)
+        await client.close()
+        return exchange, frames
+
+    exchange, frames = asyncio.run(main())
+    assert len(frames) == 10
+    assert all(len(frame) == 50 for frame in frames.values())
+    assert exchange.max_active == 3
+    assert exchange.closed
+
+
+def test_async_retry():
+    async def main():
+        exchange = FakeAsyncExchange(failures=2)
+        client = AsyncTradingClient(exchange)
+        data = await client.get_data_historical('BTC/USDT', limit=10)
+        return exchange, data
+
+    exchange, data = asyncio.run(main())
+    assert len(data) == 10
+    assert exchange.requests == 3
+
+
+def test_async_gives_up(monkeypatch):
+    monkeypatch.setattr(utils, 'WAIT_SUCCESS_ATTEMPTS', 3)
+
+    async def main():
+        client = AsyncTradingClient(FakeAsyncExchange(failures=5))
+        try:
+            await client.get_data_historical('BTC/USDT', limit=10)
+        finally:
+            await client.close()
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(main())
+
+
+def test_async_orders_and_close():
+    async def main():
+        exchange = FakeAsyncExchange()
+        client = AsyncTradingClient(exchange)
+        price = await client.get_ticker_price('BTC/USDT')
+        balance = await client.get_balance('USDT')
+        await client.new_order_buy('BTC/USDT', 2.0)
+        await client.exit_last_order()
+        await client.close()
+        return exchange, price, balance
+
+    exchange, price, balance = asyncio.run(main())
+    assert (price, balance) == (123.5, 1000.0)
+    assert exchange.orders == [('buy', 'BTC/USDT', 2.0, {'reduce_only': False}),
+                               ('sell', 'BTC/USDT', 2.0, {'reduce_only': True})]
+    assert exchange.closed
+
+
+def test_tickers_prices_without_close():
+    client = TradingClient(FakeTickersExchange({'BTC/USDT': 10.0, 'NEW/USDT': None}))
+    assert client.get_tickers_prices(['BTC/USDT', 'NEW/USDT']) == {'BTC/USDT': 10.0}
+
+
+def test_price_poller_unpriced():
+    exchange = FakeTickersExchange({'BTC/USDT': 10.0, 'NEW/USDT': 20.0})
+    poller = PricePoller(TradingClient(exchange))
+    poller.watch('BTC/USDT', 'NEW/USDT')
+    poller.poll()
+    exchange.closes['NEW/USDT'] = None
+    poller.poll()
+    assert poller.unpriced == ['NEW/USDT']
+    assert poller.get_price('BTC/USDT') == 10.0
+    assert poller.get_price('NEW/USDT') == 50.0  # requested with get_ticker_price, not the stale price
+
+
+@pytest.mark.parametrize('page_size', [None, 40])
+def test_cached_client_refresh_without_holes(tmp_path, monkeypatch, page_size):
+    client = CachedTradingClient(FakeExchange(page_size=page_size), cache_dir=str(tmp_path))
+    monkeypatch.setattr(sys.modules[__name__], 'CANDLES', 200)
+    first = len(client.get_data_historical('BTC/USDT', '1m', limit=100))
+    assert first == min(100, page_size or 100)
+    # the history has grown by much more than one page
+    monkeypatch.setattr(sys.modules[__name__], 'CANDLES', 2_000)
+    data = client.get_data_historical('BTC/USDT', '1m', limit=100)
+    assert data['time'].iloc[-1] == START + 1_999 * MINUTE
+    cached = client._load_cache(client._cache_path('BTC/USDT', '1m'))
+    assert len(cached['time']) == 1_800 + first
+    assert np.all(np.diff(cached['time']) == MINUTE)
+
+
+def test_request_weights(monkeypatch):
+    monkeypatch.setattr(brokers, '_rate_limiters', {})
+    exchange = FakeTickersExchange({'BTC/USDT': 10.0, 'ETH/USDT': 20.0})
+    exchange.rateLimit = 1000  # 1 token per second
+    client = TradingClient(exchange)
+    limiter = brokers.rate_limiter(exchange)
+    limiter.capacity = limiter.tokens = 1_000.0
+
+    client.get_ticker_price('BTC/USDT')
+    ticker_tokens = 1_000.0 - limiter.tokens
+    client.get_tickers_prices(['BTC/USDT', 'ETH/USDT'])
+    tickers_tokens = 1_000.0 - ticker_tokens - limiter.tokens
+    ratio = brokers.REQUEST_WEIGHTS['fetch_tickers'] / brokers.REQUEST_WEIGHTS['fetch_ticker']
+    assert tickers_tokens == pytest.approx(ticker_tokens * ratio, rel=1e-2)
+
+
+def test_request_weights_of_ccxt_api():
+    exchange = ccxt.binance()
+    endpoint = exchange.api['public']['get']['ticker/24hr']
+    assert brokers.request_weight(exchange, 'fetch_ticker') == endpoint['cost']
+    assert brokers.request_weight(exchange, 'fetch_tickers') == endpoint['noSymbol']
+    assert brokers.request_weight(exchange, 'fetch_tickers') > 10 * brokers.request_weight(exchange, 'fetch_ticker')
+    assert brokers.request_weight(FakeExchange(), 'fetch_balance') == brokers.REQUEST_WEIGHTS['fetch_balance']
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from quick_trade import utils
+
+
+def make_equity(curves: int = 4, n: int = 1_000, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    equity = 10_000 * np.exp(np.cumsum(rng.normal(0, 0.01, (curves, n)), axis=1))
+    equity[1, 500:] = np.nan  # the trade was opened out of range
+    return equity
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_batch_matches_single(seed):
+    equity = make_equity(seed=seed)
+    trades = np.array([10, 0, 7, 3])
+    profit_trades = np.array([6, 0, 2, 3])
+    batch = utils.strategy_characteristics_batch(equity, timeframe='1h', profit_trades=profit_trades, trades=trades)
+    for e, curve in enumerate(equity):
+        single = utils.strategy_characteristics(equity=curve,
+                                                trades=trades[e],
+                                                profit_trades=profit_trades[e],
+                                                timeframe='1h')
+        for name in utils.TUNER_CODECONF:
+            np.testing.assert_allclose(single[name], batch[name][e], rtol=1e-9, err_msg=name)
+
+
+def test_max_drawdown():
+    equity = np.array([100.0, 120.0, 90.0, np.nan, 130.0, 117.0])
+    assert utils.strategy_characteristics(equity=equity, timeframe='1h')['max drawdown'] == pytest.approx(25.0)
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quick_trade import utils
+from quick_trade.plots import TraderGraph
+from quick_trade.trading_sys import Trader
+
+COMMISSION = 0.1  # percents
+STOP_LOSS = 97.0
+
+
+def make_trader() -> Trader:
+    close = np.array([100, 101, 102, 99, 98, 99, 100, 101, 102, 103,
+                      104, 103, 102, 101, 100, 101, 102, 103, 104, 105], dtype=float)
+    low = close - 0.5
+    low[3] = 95.0  # the stop loss of the first trade
+    df = pd.DataFrame({'time': np.arange(len(close)) * 3_600_000.0,
+                       'Open': close,
+                       'High': close + 0.5,
+                       'Low': low,
+                       'Close': close,
+                       'Volume': np.ones(len(close))})
+    trader = Trader('BTC/USDT', df, '1h')
+    trader.connect_graph(TraderGraph())
+    trader.returns = [utils.BUY] * 10 + [utils.SELL] * 5 + [utils.EXIT] * 5
+    trader.returns_update()
+    trader.set_credit_leverages(1.0)
+    trader.set_open_stop_and_take()
+    trader.stop_losses[:10] = [STOP_LOSS] * 10
+    return trader
+
+
+@pytest.mark.parametrize('engine', ['loop', 'vectorized', 'stream'])
+def test_ledger_stop_loss_and_commission(engine):
+    trader = make_trader()
+    trader.backtest(plot=False, show=False, print_out=False, commission=COMMISSION, engine=engine, ledger=True)
+    deposits = np.array(trader.deposit_history)
+    ledger = trader.ledger
+    rate = COMMISSION / 100
+
+    assert len(ledger) == trader.trades == 2
+    buy, sell = ledger
+    # the stop loss was reached at the 3rd candle, the trade was closed by the signal at the 10th one
+    assert (buy['entry'], buy['exit'], buy['side']) == (0, 3, utils.BUY.value)
+    assert buy['exit_price'] == STOP_LOSS
+    assert deposits[10] == deposits[4]
+
+    buy_opening = deposits[0] * rate
+    buy_closing = deposits[10] * rate
+    assert buy['commission'] == pytest.approx(buy_opening + buy_closing, rel=1e-12)
+    assert buy['pnl'] == pytest.approx(deposits[10] - buy_closing - (deposits[0] - buy_opening), rel=1e-12)
+
+    sell_opening = (deposits[10] - buy_closing) * rate
+    sell_closing = deposits[15] * rate
+    assert (sell['entry'], sell['exit'], sell['side']) == (10, 15, utils.SELL.value)
+    assert sell['exit_price'] == trader.df['Close'][15]
+    assert sell['commission'] == pytest.approx(sell_opening + sell_closing, rel=1e-12)
+    assert sell['pnl'] == pytest.approx(deposits[15] - sell_closing - (deposits[10] - buy_closing - sell_opening),
+                                        rel=1e-12)
+    # the ledger and the commissions of the openings add up to the deposit after the last trade
+    exit_opening = (deposits[15] - sell_closing) * rate
+    assert deposits[16] == pytest.approx(deposits[0] - buy_opening + buy['pnl'] - sell_opening + sell['pnl'] -
+                                         exit_opening, rel=1e-12)
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from quick_trade import utils
+from quick_trade.plots import TraderGraph
+from quick_trade.trading_sys import Trader
+
+
+def make_trader() -> Trader:
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 200)))
+    df = pd.DataFrame({'time': np.arange(len(close)) * 3_600_000.0,
+                       'Open': close,
+                       'High': close * 1.01,
+                       'Low': close * 0.99,
+                       'Close': close,
+                       'Volume': np.ones(len(close))})
+    trader = Trader('BTC/USDT', df, '1h')
+    trader.connect_graph(TraderGraph())
+    trader.returns = list(rng.choice([utils.BUY, utils.SELL, utils.EXIT], len(close)))
+    trader.returns_update()
+    trader.set_credit_leverages(1.0)
+    trader.set_open_stop_and_take()
+    return trader
+
+
+@pytest.mark.parametrize('engine', ['loop', 'vectorized', 'stream'])
+def test_metrics_only_resets_outputs(engine):
+    trader = make_trader()
+    trader.backtest(plot=False, show=False, print_out=False, engine=engine)
+    assert trader.backtest_out is not None
+    assert trader.average_growth is not None
+    assert trader.net_returns is not None
+
+    trader.returns = [utils.EXIT] * len(trader.df)
+    trader.returns_update()
+    trader.backtest(plot=False, show=False, print_out=False, engine=engine, metrics_only=True)
+    # the outputs of the first backtest do not describe the new deposit history
+    assert trader.backtest_out is None
+    assert trader.average_growth is None
+    assert trader.net_returns is None
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from quick_trade import trading_sys
+from quick_trade import utils
+from quick_trade.brokers import TradingClient
+from quick_trade.trading_sys import ExampleStrategies
+
+CANDLES = 60
+TRADED = 5  # candles traded in real time after the history
+
+
+class StopTrading(Exception):
+    pass
+
+
+class FakeClient(TradingClient):
+    """
+    Candles of a fake exchange: the last candle is not closed, its close is still the open price.
+    Every request of the history (limit=1000) but the first one starts the next candle.
+    """
+    def __init__(self, candles: pd.DataFrame):
+        super().__init__(client=object(), trading=False)
+        self.candles = candles
+        self.current = CANDLES - TRADED - 1  # index of the unclosed candle
+
+    def get_data_historical(self, ticker=None, interval='1m', limit=1000):
+        if limit == 2:
+            # the period of the current candle is over, the next one is not started yet
+            frame = self.candles.iloc[self.current - 1:self.current + 1]
+        else:
+            self.current += 1
+            if self.current == CANDLES:
+                raise StopTrading()
+            frame = self.candles.iloc[max(self.current + 1 - limit, 0):self.current + 1].copy()
+            frame.iloc[-1, frame.columns.get_loc('Close')] = frame['Open'].iloc[-1]
+        return frame.reset_index(drop=True)
+
+
+class RecordingStream(utils.StreamingBacktest):
+    def __init__(self):
+        super().__init__()
+        self.closes = []
+
+    def update(self, close, *args, **kwargs):
+        self.closes.append(close)
+        return super().update(close, *args, **kwargs)
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    clock = [0.0]
+
+    def fake_time():
+        clock[0] += 20.0
+        return clock[0]
+
+    monkeypatch.setattr(trading_sys, 'time', fake_time)
+    monkeypatch.setattr(trading_sys, 'sleep', lambda seconds: None)
+
+
+def test_paper_trading_closed_candles(fake_clock):
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, CANDLES)))
+    candles = pd.DataFrame({'time': np.arange(CANDLES) * 60_000.0,
+                            'Open': np.r_[close[0], close[:-1]],
+                            'High': close * 1.01,
+                            'Low': close * 0.99,
+                            'Close': close,
+                            'Volume': np.ones(CANDLES)})
+    trader = ExampleStrategies('BTC/USDT', interval='1m')
+    client = FakeClient(candles)
+    trader.set_client(client)
+    trader.stream = RecordingStream()
+    with pytest.raises(StopTrading):
+        trader.realtime_trading(trader.strategy_2_sma,
+                                start_time=datetime.now(),
+                                print_out=False,
+                                wait_sl_tp_checking=5,
+                                plot=False,
+                                slow=10,
+                                fast=5)
+    # the final closes of the traded candles, not the prices when the strategy was run
+    assert trader.stream.closes == list(close[CANDLES - TRADED:])